@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+import logging
+import sys
+
+import click
+from modules.market.codec import decode
+from modules.market.feed import FeedReceiver
+from modules.market.utils import Book, BookUpdate
+from modules.utils import setup_logging
+
+
+def address(value):
+    host, port = value.rsplit(":", 1)
+    return host, int(port)
+
+
+@click.command(
+    context_settings=dict(help_option_names=["-h", "--help"]),
+    options_metavar="[options...]",
+)
+@click.option(
+    "--feed",
+    default="127.0.0.1:9100",
+    show_default=True,
+    help="host:port the market data server publishes to, a multicast group "
+    "or a loopback address.",
+)
+@click.option(
+    "--retransmit",
+    default="localhost:9101",
+    show_default=True,
+    help="host:port of the retransmission service.",
+)
+@click.option(
+    "--interface",
+    default="127.0.0.1",
+    show_default=True,
+    help="Address of the interface to join a multicast group on.",
+)
+@click.option(
+    "-d",
+    "--debug",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Print debug messages.",
+)
+def main(
+    feed="127.0.0.1:9100",
+    retransmit="localhost:9101",
+    interface="127.0.0.1",
+    debug=None,
+):
+    """Market data feed client
+
+    Receives books from the market data server's UDP feed and prints them.
+
+    """
+    if debug:
+        logger.setLevel(logging.DEBUG)
+        logger.info("Logging set to debug.")
+    else:
+        logger.setLevel(logging.INFO)
+        logger.info("Logging set to info.")
+
+    receiver = FeedReceiver(address(feed), address(retransmit), interface)
+    books = {}
+
+    try:
+        for payload in receiver.snapshot():
+            apply(books, decode(payload, Book, BookUpdate))
+
+        logger.info(f"Joined feed {feed} at sequence {receiver.next}.")
+
+        while True:
+            for payload in receiver.recv(timeout=1):
+                book = apply(books, decode(payload, Book, BookUpdate))
+                if book is not None:
+                    print(book)
+
+    except KeyboardInterrupt:
+        logger.info(
+            f"Caught interrupt, exiting... {receiver.retransmitted} messages "
+            f"retransmitted, {receiver.snapshots} snapshots."
+        )
+        receiver.close()
+        sys.exit()
+
+
+def apply(books, book):
+    """Apply a snapshot or update to ``books``, return the book to show."""
+    symbol = book.symbol
+
+    if isinstance(book, BookUpdate):
+        if symbol not in books or book.sequence != books[symbol][2] + 1:
+            logger.warning(f"{symbol} update {book.sequence} out of sequence.")
+            books.pop(symbol, None)
+            return None
+
+        bids, asks, _ = books[symbol]
+        levels = {"b": bids, "s": asks}
+        for action, side, price, size, _ in book.changes:
+            if action == "delete":
+                levels[side].pop(price, None)
+            else:
+                levels[side][price] = size
+        books[symbol] = (bids, asks, book.sequence)
+    else:
+        books[symbol] = (dict(book.bids), dict(book.asks), book.sequence)
+
+    bids, asks, sequence = books[symbol]
+    return Book(
+        symbol,
+        sorted(bids.items(), reverse=True),
+        sorted(asks.items()),
+        book.trades,
+        sequence,
+    )
+
+
+if __name__ == "__main__":
+    logger = setup_logging("logs/", "feed")
+    main()
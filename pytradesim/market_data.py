@@ -1,11 +1,17 @@
 #!/usr/bin/env python
 import logging
+import threading
+from functools import partial
 from multiprocessing.connection import Listener
+from time import perf_counter, sleep
 
 import click
 import quickfix as fix
+from modules.market import codec
+from modules.market.codec import BookReader, decode
+from modules.market.feed import FeedPublisher
 from modules.market.mda import MarketDataAdapter
-from modules.market.utils import Book
+from modules.market.utils import Book, BookUpdate
 from modules.utils import setup_logging
 
 
@@ -14,6 +20,39 @@ from modules.utils import setup_logging
     options_metavar="[options...]",
 )
 @click.option("--port", "-p", default=9000, show_default=True, help="Listening port.")
+@click.option(
+    "--ring",
+    default="",
+    help="Read books from the exchange's shared memory ring buffer of this name "
+    "instead of listening on --port.",
+)
+@click.option(
+    "--feed",
+    default="",
+    help="Also publish books as UDP datagrams to this host:port, a multicast "
+    "group such as 239.1.1.1:9100 or a loopback address.",
+)
+@click.option(
+    "--feed-interface",
+    default="127.0.0.1",
+    show_default=True,
+    help="Address of the interface multicast datagrams are sent from.",
+)
+@click.option(
+    "--feed-ttl", default=1, show_default=True, help="Multicast time to live."
+)
+@click.option(
+    "--retransmit-port",
+    default=9101,
+    show_default=True,
+    help="TCP port serving missed datagrams and snapshots to feed readers.",
+)
+@click.option(
+    "--retransmit-history",
+    default=10000,
+    show_default=True,
+    help="No.of datagrams kept for retransmission.",
+)
 @click.option(
     "-d",
     "--debug",
@@ -22,10 +61,19 @@ from modules.utils import setup_logging
     show_default=True,
     help="Print debug messages.",
 )
-def main(port=9000, debug=None):
+def main(
+    port=9000,
+    ring="",
+    feed="",
+    feed_interface="127.0.0.1",
+    feed_ttl=1,
+    retransmit_port=9101,
+    retransmit_history=10000,
+    debug=None,
+):
     """FIX price gateway
 
-    Sends market data snapshot over FIX.
+    Sends market data snapshots and incremental refreshes over FIX.
 
     """
     if debug:
@@ -47,25 +95,117 @@ def main(port=9000, debug=None):
 
     acceptor = fix.SocketAcceptor(app, store, settings, log)
 
+    publisher = None
+    # held while a book is dispatched and published, so feed snapshots match
+    # the feed sequence number
+    lock = threading.Lock()
+
+    if feed:
+        host, feed_port = feed.rsplit(":", 1)
+        publisher = FeedPublisher(
+            (host, int(feed_port)), feed_interface, feed_ttl, history=retransmit_history
+        )
+        publisher.serve(retransmit_port, partial(feed_snapshot, app, publisher, lock))
+        logger.info(
+            f"Publishing books to {feed}, retransmission on port {retransmit_port}."
+        )
+
+    handle = partial(forward, app, publisher, lock)
+
     try:
         acceptor.start()
 
         logger.info("FIX.4.2 maarket data server started.")
+
+        if ring:
+            follow_ring(handle, publisher, ring)
+            return
+
         logger.debug(f"Starting listener on port {port}.")
 
         conn = Listener(address, authkey=b"Dj$0.Jkx1@").accept()
 
         logger.debug(f"Accepted orderbook connection on port {port}.")
 
+        reader = BookReader(conn, Book, BookUpdate)
+
         while True:
-            book = conn.recv()
-            app.dispatch(book)
+            if not conn.poll(1):
+                if publisher is not None:
+                    publisher.heartbeat()
+                continue
+
+            book = reader.recv()
+            if handle(book, reader.payload()):
+                # an update was missed, ask the exchange for a snapshot
+                conn.send_bytes(book.symbol.encode())
 
     except (fix.ConfigError, fix.RuntimeError) as error:
         raise fix.RuntimeError(error)
     except KeyboardInterrupt:
         logger.info(f"Got signal interrupt, exiting...")
         acceptor.stop()
+        if publisher is not None:
+            publisher.close()
+
+
+def forward(app, publisher, lock, book, payload):
+    """Send a book to the FIX subscribers and the feed, return True if the
+    adapter needs a snapshot."""
+    with lock:
+        recover = app.dispatch(book)
+        if publisher is not None:
+            try:
+                publisher.publish(payload)
+            except (OSError, ValueError) as error:
+                logger.error(f"Failed to publish {book.symbol} on the feed: {error}")
+    return recover
+
+
+def feed_snapshot(app, publisher, lock):
+    with lock:
+        books = [codec.encode(app.book(symbol)) for symbol in app.books]
+        return publisher.sequence + 1, books
+
+
+def follow_ring(handle, publisher, name):
+    from modules.market.ring import RingBuffer, RingReader
+
+    while True:
+        try:
+            ring = RingBuffer.attach(name)
+            break
+        except FileNotFoundError:
+            logger.debug(f"Waiting for ring buffer {name}.")
+            sleep(1)
+
+    logger.info(f"Reading books from ring buffer {name}.")
+
+    reader = RingReader(ring)
+    lost = 0
+    idle = perf_counter()
+
+    while True:
+        result = reader.read(read_ring)
+        if result is None:
+            if publisher is not None and perf_counter() - idle >= 1:
+                publisher.heartbeat()
+                idle = perf_counter()
+            sleep(0.0005)
+            continue
+
+        idle = perf_counter()
+        # updates after a gap are dropped until the next periodic snapshot
+        handle(*result)
+
+        if reader.lost != lost:
+            logger.warning(f"Lapped by the exchange, {reader.lost} books lost.")
+            lost = reader.lost
+
+
+def read_ring(data):
+    # the payload is copied out of the ring for the feed's retransmit history
+    return decode(data, Book, BookUpdate), bytes(data)
 
 
 if __name__ == "__main__":
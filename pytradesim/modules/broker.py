@@ -1,15 +1,228 @@
+import logging
+import threading
+import time
+
 import quickfix as fix
 
 from .orderbook import Order, Orderbook
+from .outbound import OutboundSender
+from .sharding import MatchingShards
+from .utils import ExecutionReports, FieldExtractor
+
+
+class OrderState:
+    """What the exchange knows about a live order of a session."""
 
-CLIENT_ORDER_IDs = {}
+    __slots__ = ("order_id", "symbol", "side", "quantity", "leaves")
 
-ORDER_IDs = {}
-EXECUTION_IDs = {}
+    def __init__(self, order_id, symbol, side, quantity):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.leaves = quantity
+
+    def __repr__(self):
+        return (
+            f"OrderState(order_id={self.order_id}, symbol={self.symbol}, "
+            f"side={self.side}, quantity={self.quantity}, leaves={self.leaves})"
+        )
 
-MARKETS = {}
 
-FLUSH_BOOK = {}
+class OrderRegistry:
+    """Live orders of every session, keyed by session and then ClOrdID.
+
+    An order is added when the exchange accepts it and removed once it is
+    filled, cancelled or replaced, so lookups stay constant time however many
+    orders a session has sent. The exchange OrderID is assigned once and
+    carried over on replace, giving every report of an order the same ID.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(orders) for orders in self.sessions.values())
+
+    def add(self, session, client_order_id, state):
+        """Add an order, return False if the ClOrdID is already live."""
+        with self._lock:
+            orders = self.sessions.setdefault(session, {})
+            if client_order_id in orders:
+                return False
+            orders[client_order_id] = state
+            return True
+
+    def get(self, session, client_order_id):
+        with self._lock:
+            return self.sessions.get(session, {}).get(client_order_id)
+
+    def pop(self, session, client_order_id):
+        with self._lock:
+            orders = self.sessions.get(session)
+            if orders is None:
+                return None
+            return orders.pop(client_order_id, None)
+
+    def fill(self, session, client_order_id, quantity):
+        """Reduce the leaves of an order, dropping it once nothing is left."""
+        with self._lock:
+            orders = self.sessions.get(session)
+            if orders is None or client_order_id not in orders:
+                return None
+            state = orders[client_order_id]
+            state.leaves -= quantity
+            if state.leaves <= 0:
+                state.leaves = 0
+                del orders[client_order_id]
+            return state
+
+
+class ExchangeState:
+    """State shared by the FIX callback threads and the market data publisher.
+
+    Everything keyed by symbol (books, order and execution ID counters, the
+    book flush list) is only touched while holding that symbol's lock, so
+    sessions trading different symbols run in parallel. Live orders are per
+    session and shared across symbols, the registry has its own lock.
+
+    Handlers call ``book_changed`` after touching a book, which wakes the
+    market data publisher waiting in ``changed_books``.
+    """
+
+    def __init__(self):
+        self.orders = OrderRegistry()
+        self.client_order_ids = self.orders.sessions
+        self.order_ids = {}
+        self.execution_ids = {}
+        self.markets = {}
+        self.flush_book = {}
+        self.changed = threading.Condition()
+        self._changed_since = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def lock(self, symbol):
+        lock = self._locks.get(symbol)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(symbol, threading.Lock())
+        return lock
+
+    def book_changed(self, symbol):
+        """Mark a book for publishing, return its list of unpublished trades.
+
+        The caller must hold the symbol's lock.
+        """
+        trades = self.flush_book.setdefault(symbol, [])
+        with self.changed:
+            if symbol not in self._changed_since:
+                self._changed_since[symbol] = time.perf_counter()
+                self.changed.notify()
+        return trades
+
+    def changed_books(self, timeout=None):
+        """Wait for changed books and return them.
+
+        The result maps each symbol to the ``time.perf_counter()`` of its first
+        unpublished change. It is empty if nothing changed within ``timeout``.
+        """
+        with self.changed:
+            if not self._changed_since:
+                self.changed.wait(timeout)
+            changed, self._changed_since = self._changed_since, {}
+        return changed
+
+
+STATE = ExchangeState()
+
+CLIENT_ORDER_IDs = STATE.client_order_ids
+
+ORDER_IDs = STATE.order_ids
+EXECUTION_IDs = STATE.execution_ids
+
+MARKETS = STATE.markets
+
+FLUSH_BOOK = STATE.flush_book
+
+TAG_ORDER_ID = fix.OrderID().getTag()
+TAG_EXEC_ID = fix.ExecID().getTag()
+TAG_ORD_STATUS = fix.OrdStatus().getTag()
+TAG_SIDE = fix.Side().getTag()
+TAG_CL_ORD_ID = fix.ClOrdID().getTag()
+TAG_EXEC_TYPE = fix.ExecType().getTag()
+TAG_EXEC_TRANS_TYPE = fix.ExecTransType().getTag()
+TAG_AVG_PX = fix.AvgPx().getTag()
+TAG_LAST_PX = fix.LastPx().getTag()
+TAG_CUM_QTY = fix.CumQty().getTag()
+TAG_LAST_SHARES = fix.LastShares().getTag()
+TAG_ORDER_QTY = fix.OrderQty().getTag()
+TAG_ORIG_CL_ORD_ID = fix.OrigClOrdID().getTag()
+TAG_TEXT = fix.Text().getTag()
+TAG_ORD_REJ_REASON = fix.OrdRejReason().getTag()
+TAG_LEAVES_QTY = fix.LeavesQty().getTag()
+TAG_SYMBOL = fix.Symbol().getTag()
+TAG_ORD_TYPE = fix.OrdType().getTag()
+TAG_PRICE = fix.Price().getTag()
+TAG_MSG_TYPE = fix.MsgType().getTag()
+
+ORDER_TYPES = {fix.OrdType_MARKET: "MARKET", fix.OrdType_LIMIT: "LIMIT"}
+
+# OrdRejReason 0, not named the same in every quickfix release
+ORD_REJ_REASON_BROKER_OPTION = 0
+
+# inbound message type -> (field extractor, handler, description), the symbol
+# is always extracted first as the books are locked by symbol. A missing
+# required tag raises fix.FieldNotFound, which quickfix answers with a reject.
+INBOUND = {
+    fix.MsgType_NewOrderSingle: (
+        FieldExtractor(
+            TAG_SYMBOL,
+            TAG_CL_ORD_ID,
+            TAG_SIDE,
+            TAG_ORD_TYPE,
+            TAG_PRICE,
+            TAG_ORDER_QTY,
+            required=(TAG_SYMBOL, TAG_CL_ORD_ID, TAG_SIDE, TAG_ORD_TYPE, TAG_ORDER_QTY),
+        ),
+        "new_order_single",
+        "new order",
+    ),
+    fix.MsgType_OrderCancelRequest: (
+        FieldExtractor(
+            TAG_SYMBOL,
+            TAG_CL_ORD_ID,
+            TAG_SIDE,
+            TAG_ORIG_CL_ORD_ID,
+            required=(TAG_SYMBOL, TAG_CL_ORD_ID, TAG_SIDE, TAG_ORIG_CL_ORD_ID),
+        ),
+        "order_cancel",
+        "cancel order",
+    ),
+    fix.MsgType_OrderCancelReplaceRequest: (
+        FieldExtractor(
+            TAG_SYMBOL,
+            TAG_CL_ORD_ID,
+            TAG_SIDE,
+            TAG_ORD_TYPE,
+            TAG_PRICE,
+            TAG_ORDER_QTY,
+            TAG_ORIG_CL_ORD_ID,
+            required=(
+                TAG_SYMBOL,
+                TAG_CL_ORD_ID,
+                TAG_SIDE,
+                TAG_ORD_TYPE,
+                TAG_ORDER_QTY,
+                TAG_ORIG_CL_ORD_ID,
+            ),
+        ),
+        "order_replace",
+        "replace order",
+    ),
+}
 
 
 class Message(fix.Message):
@@ -42,9 +255,37 @@ class BaseApplication(fix.Application):
 
 
 class MessageBroker(BaseApplication):
+    state = STATE
+    pool = None
+    duplicate_window = 0
+    deltas = False
+    shards = None
+    sender = None
+    reports = ExecutionReports()
+
     def set_logging(self, logger):
         self.logger = logger
 
+    def set_pool(self, pool):
+        self.pool = pool
+
+    def set_duplicate_window(self, size):
+        self.duplicate_window = size
+
+    def set_raw_reports(self, raw):
+        self.reports = ExecutionReports(raw=raw)
+
+    def set_deltas(self, enabled):
+        self.deltas = enabled
+
+    def set_sender(self, maxsize, batch=64):
+        self.sender = OutboundSender(self.send, self.logger, maxsize, batch)
+        self.sender.start()
+
+    def set_shards(self, workers):
+        self.shards = MatchingShards(workers, self.dispatch, self.logger)
+        self.shards.start()
+
     def onCreate(self, sessionID):
         self.sessions = set()
         self.logger.info(f"Successfully created session {sessionID}.")
@@ -61,344 +302,558 @@ class MessageBroker(BaseApplication):
         return
 
     def fromApp(self, message, sessionID):
+        if self.shards is None:
+            self.dispatch(message, sessionID)
+            return
+
+        # the shard cannot raise back into quickfix, check required tags here
+        msgtype = message.getHeader().getField(TAG_MSG_TYPE)
+        if msgtype in INBOUND:
+            for tag in INBOUND[msgtype][0].required:
+                message.getField(tag)
+
+        # the callback's message is only valid until we return, hand over a copy
+        self.shards.submit(
+            message.getField(TAG_SYMBOL), fix.Message(message), sessionID
+        )
+
+    def dispatch(self, message, sessionID):
         responses = self.process(message, sessionID)
 
+        if self.sender is not None:
+            if responses:
+                self.sender.put(responses)
+            return
+
         for response in responses:
             if isinstance(response[1], fix.Message):
-                try:
-                    msg = response[1].__str__()
-                    msg = msg.replace("\x01", "|")
-                    self.logger.debug(f"Sending: {msg}")
-                    fix.Session.sendToTarget(response[1], response[0])
-                except fix.SessionNotFound as error:
-                    raise fix.SessionNotFound(error)
+                self.send(response[1], response[0])
         return
 
+    def send(self, message, sessionID):
+        try:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                msg = message.__str__()
+                msg = msg.replace("\x01", "|")
+                self.logger.debug(f"Sending: {msg}")
+            fix.Session.sendToTarget(message, sessionID)
+        except fix.SessionNotFound as error:
+            raise fix.SessionNotFound(error)
+
     def process(self, message, sessionID):
-        msgtype = fix.MsgType()
-        message.getHeader().getField(msgtype)
+        msgtype = message.getHeader().getField(TAG_MSG_TYPE)
 
-        if msgtype.getValue() == "D":
-            self.logger.info(f"Incoming new order from {sessionID}. Processing...")
-            responses = self.new_order_single(message, sessionID)
-        elif msgtype.getValue() == "F":
-            self.logger.info(f"Incoming cancel order from {sessionID}. Processing...")
-            responses = self.order_cancel(message, sessionID)
-        elif msgtype.getValue() == "G":
-            self.logger.info(f"Incoming replace order from {sessionID}. Processing...")
-            responses = self.order_replace(message, sessionID)
+        if msgtype not in INBOUND:
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(f"Ignoring message type {msgtype} from {sessionID}.")
+            return []
 
-        return responses
+        extract, handler, description = INBOUND[msgtype]
+        fields = extract(message)
+
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(f"Incoming {description} from {sessionID}. Processing...")
+
+        with self.state.lock(fields[0]):
+            return getattr(self, handler)(fields, sessionID)
 
     def _create_execution_report(
         self,
+        sessionID,
         symbol,
         side,
         client_order_id,
         price=None,
         quantity=None,
+        order_quantity=None,
         order_status=fix.OrdStatus_NEW,
         exec_trans_type=fix.ExecTransType_NEW,
         exec_type=fix.ExecType_NEW,
         text=None,
         reject_reason=None,
         orig_client_order_id=None,
+        order_id=None,
+        leaves_quantity=0,
     ):
-        # defaults
-        execution_report = Message()
-        execution_report.getHeader().setField(fix.MsgType(fix.MsgType_ExecutionReport))
-
-        execution_report.setField(
-            fix.OrderID(self.generate_order_id(symbol.getValue()))
-        )
-        execution_report.setField(
-            fix.ExecID(self.generate_execution_id(symbol.getValue()))
-        )
-        execution_report.setField(fix.OrdStatus(order_status))
-        execution_report.setField(symbol)
-        execution_report.setField(side)
-        execution_report.setField(client_order_id)
-        execution_report.setField(fix.ExecTransType(exec_trans_type))
-        execution_report.setField(fix.ExecType(exec_type))
-        execution_report.setField(fix.LeavesQty(0))
+        if order_id is None:
+            order_id = self.generate_order_id(symbol)
+
+        # the session and symbol fields come from the cached template
+        fields = [
+            (TAG_ORDER_ID, order_id),
+            (TAG_EXEC_ID, self.generate_execution_id(symbol)),
+            (TAG_ORD_STATUS, order_status),
+            (TAG_SIDE, side),
+            (TAG_CL_ORD_ID, client_order_id),
+            (TAG_EXEC_TYPE, exec_type),
+            (TAG_LEAVES_QTY, leaves_quantity),
+        ]
+
+        if exec_trans_type != fix.ExecTransType_NEW:
+            fields.append((TAG_EXEC_TRANS_TYPE, exec_trans_type))
 
         if price:
-            execution_report.setField(fix.AvgPx(price.getValue()))
-            execution_report.setField(fix.LastPx(price.getValue()))
+            fields.append((TAG_AVG_PX, price))
+            fields.append((TAG_LAST_PX, price))
 
         if quantity:
-            execution_report.setField(fix.CumQty(quantity.getValue()))
-            execution_report.setField(fix.LastShares(quantity.getValue()))
-            execution_report.setField(quantity)
+            fields.append((TAG_CUM_QTY, quantity))
+            fields.append((TAG_LAST_SHARES, quantity))
+
+        if order_quantity:
+            fields.append((TAG_ORDER_QTY, order_quantity))
 
         if orig_client_order_id:
-            execution_report.setField(fix.OrigClOrdID(orig_client_order_id.getValue()))
+            fields.append((TAG_ORIG_CL_ORD_ID, orig_client_order_id))
 
         if text:
-            execution_report.setField(fix.Text(text))
+            fields.append((TAG_TEXT, text))
 
         if exec_type == fix.ExecType_REJECTED:
-            execution_report.setField(fix.OrdRejReason(reject_reason))
+            fields.append((TAG_ORD_REJ_REASON, reject_reason))
+
+        execution_report = self.reports.build(sessionID, symbol, fields)
 
-        self.logger.debug(f"Created execution report {execution_report.__str__()}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Created execution report {execution_report.__str__()}")
 
         return execution_report
 
-    def __get_attributes(self, message):
-        price = fix.Price()
-        quantity = fix.OrderQty()
-        symbol = fix.Symbol()
-        side = fix.Side()
-        order_type = fix.OrdType()
-        client_order_id = fix.ClOrdID()
+    def _make_order(
+        self, symbol, price, quantity, side, order_type, client_order_id, sessionID
+    ):
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Unsupported order type {order_type}.")
 
-        message.getField(client_order_id)
-        message.getField(side)
-        message.getField(order_type)
-        message.getField(symbol)
-        message.getField(price)
-        message.getField(quantity)
+        order_side = "b" if side == "1" else "s"
+
+        if self.pool is None:
+            return Order.make(
+                symbol,
+                price,
+                quantity,
+                order_side,
+                ORDER_TYPES[order_type],
+                client_order_id,
+                sessionID,
+                time.time() * 1e6,
+            )
 
-        return (symbol, price, quantity, side, order_type, client_order_id)
+        return self.pool.order(
+            symbol,
+            price,
+            quantity,
+            order_side,
+            ORDER_TYPES[order_type],
+            client_order_id,
+            sessionID,
+            time.time() * 1e6,
+        )
 
     def _handle_trade(self, symbol, trade, sessionID):
         self.logger.info("Trade(s) executed.")
 
+        order = self.state.orders.fill(
+            trade.session.toString(), trade.order_id, trade.quantity
+        )
+
         # if trade.session.toString() != sessionID.toString():
         if trade.session.toString() not in self.sessions:
-            self.logger.debug(
-                f"Trade session {trade.session} and sessionID {sessionID} "
-                f"do not match, skipping trade"
-            )
-            self.logger.debug(f"Dumping trade \n{trade}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    f"Trade session {trade.session} and sessionID {sessionID} "
+                    f"do not match, skipping trade"
+                )
+                self.logger.debug(f"Dumping trade \n{trade}")
             return
 
         trade_side = "1" if trade.side == "b" else "2"
 
+        if order is not None and order.leaves > 0:
+            order_status = fix.OrdStatus_PARTIALLY_FILLED
+            exec_type = fix.ExecType_PARTIAL_FILL
+        else:
+            order_status = fix.OrdStatus_FILLED
+            exec_type = fix.ExecType_FILL
+
         execution_report = self._create_execution_report(
+            trade.session,
             symbol,
-            fix.Side(trade_side),
-            fix.ClOrdID(trade.order_id),
-            price=fix.Price(trade.price),
-            quantity=fix.LastQty(trade.quantity),
-            order_status=fix.OrdStatus_FILLED,
-            exec_type=fix.ExecType_FILL,
+            trade_side,
+            trade.order_id,
+            price=trade.price,
+            quantity=trade.quantity,
+            order_status=order_status,
+            exec_type=exec_type,
+            order_id=None if order is None else order.order_id,
+            leaves_quantity=0 if order is None else order.leaves,
         )
 
         return execution_report
 
-    def new_order_single(self, message, sessionID):
-        (
+    def _reject_missing_price(self, sessionID, symbol, side, client_order_id, quantity):
+        execution_report = self._create_execution_report(
+            sessionID,
             symbol,
-            price,
-            quantity,
             side,
-            order_type,
             client_order_id,
-        ) = self.__get_attributes(message)
+            price=0.0,
+            quantity=quantity,
+            order_quantity=quantity,
+            text="Price is required for limit orders.",
+            exec_type=fix.ExecType_REJECTED,
+            reject_reason=ORD_REJ_REASON_BROKER_OPTION,
+        )
+        return [(sessionID, execution_report)]
+
+    def new_order_single(self, fields, sessionID):
+        symbol, client_order_id, side, order_type, price, quantity = fields
+        quantity = float(quantity)
         execution_report = None
-        market = symbol.getValue()
+        market = symbol
 
-        if market not in MARKETS:
-            MARKETS[market] = Orderbook(market)
+        if price is None and order_type == fix.OrdType_LIMIT:
+            return self._reject_missing_price(
+                sessionID, symbol, side, client_order_id, quantity
+            )
+        price = float(price) if price else 0.0
 
-        order_side = "b" if side.getValue() == "1" else "s"
-        order = Order(
-            symbol.getValue(),
-            price.getValue(),
-            quantity.getValue(),
-            order_side,
-            int(order_type.getValue()),
-            client_order_id.getValue(),
-            sessionID,
+        # built first, an unsupported order type must not leave the ClOrdID
+        # registered
+        order = self._make_order(
+            symbol, price, quantity, side, order_type, client_order_id, sessionID
         )
 
-        if sessionID.toString() in CLIENT_ORDER_IDs:
-            CLIENT_ORDER_IDs[sessionID.toString()].append(client_order_id.getValue())
-        else:
-            CLIENT_ORDER_IDs[sessionID.toString()] = [client_order_id.getValue()]
+        # a ClOrdID can only be live once per session, whatever the symbol
+        session = sessionID.toString()
+        order_state = OrderState(None, symbol, side, quantity)
+        if not self.state.orders.add(session, client_order_id, order_state):
+            if self.pool is not None:
+                self.pool.release(order)
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                price=price,
+                quantity=quantity,
+                order_quantity=quantity,
+                text=f"Client order ID {client_order_id} already in use.",
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_DUPLICATE_ORDER,
+            )
+            return [(sessionID, execution_report)]
+        order_state.order_id = self.generate_order_id(symbol)
+
+        if market not in self.state.markets:
+            self.state.markets[market] = Orderbook(
+                market,
+                pool=self.pool,
+                duplicate_window=self.duplicate_window,
+                deltas=self.deltas,
+            )
 
+        book = self.state.markets[market]
         execution_reports = []
 
-        MARKETS[market].new_order(order)
+        # read before matching, a filled order may go back to the pool
+        aggressor = order.side
+        trades = book.new_order(order)
         self.logger.debug("Processed new order.")
 
-        if MARKETS[market].trades.qsize() == 0:
+        if isinstance(trades, str):
+            self.state.orders.pop(session, client_order_id)
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                price=price,
+                quantity=quantity,
+                order_quantity=quantity,
+                text=trades,
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_DUPLICATE_ORDER,
+            )
+            return [(sessionID, execution_report)]
+
+        if not trades:
             self.logger.debug("No trades.")
             execution_report = self._create_execution_report(
-                symbol, side, client_order_id, price=price, quantity=quantity,
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                price=price,
+                quantity=quantity,
+                order_quantity=quantity,
+                order_id=order_state.order_id,
+                leaves_quantity=quantity,
             )
             execution_reports.append((sessionID, execution_report))
-            FLUSH_BOOK[market] = []
+            self.state.book_changed(market)
         else:
-            FLUSH_BOOK[market] = []
-            while not MARKETS[market].trades.empty():
-                trade = MARKETS[market].trades.get()
+            flush_trades = self.state.book_changed(market)
+            for trade in trades:
                 execution_report = self._handle_trade(symbol, trade, sessionID)
 
-                FLUSH_BOOK[market].append((trade.price, trade.quantity))
+                # both sides of a fill are reported, it is published once
+                if trade.side == aggressor:
+                    flush_trades.append((trade.price, trade.quantity))
 
                 if execution_report:
                     execution_reports.append((trade.session, execution_report))
 
+                if self.pool is not None:
+                    self.pool.release(trade)
+
+        # market orders never rest, whatever they did not fill is done
+        if client_order_id not in book.live_order_ids:
+            self.state.orders.pop(session, client_order_id)
+
         return execution_reports
 
-    def order_replace(self, message, sessionID):
+    def order_replace(self, fields, sessionID):
         (
             symbol,
-            price,
-            quantity,
+            client_order_id,
             side,
             order_type,
-            client_order_id,
-        ) = self.__get_attributes(message)
-
-        orig_client_order_id = fix.OrigClOrdID()
-        message.getField(orig_client_order_id)
+            price,
+            quantity,
+            orig_client_order_id,
+        ) = fields
+        quantity = float(quantity)
 
         execution_report = None
-        market = symbol.getValue()
+        market = symbol
 
-        if market not in MARKETS:
+        if price is None and order_type == fix.OrdType_LIMIT:
+            return self._reject_missing_price(
+                sessionID, symbol, side, client_order_id, quantity
+            )
+        price = float(price) if price else 0.0
+
+        if market not in self.state.markets:
             execution_report = self._create_execution_report(
+                sessionID,
                 symbol,
                 side,
                 client_order_id,
                 price=price,
                 quantity=quantity,
-                text=f"Symbol {symbol.getValue()} not found.",
+                order_quantity=quantity,
+                text=f"Symbol {symbol} not found.",
                 exec_type=fix.ExecType_REJECTED,
                 reject_reason=fix.OrdRejReason_UNKNOWN_SYMBOL,
             )
             return [(sessionID, execution_report)]
 
-        self.logger.debug(CLIENT_ORDER_IDs)
+        session = sessionID.toString()
+        orig_order = self.state.orders.get(session, orig_client_order_id)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Replacing {orig_client_order_id}: {orig_order}")
 
-        if (sessionID.toString() not in CLIENT_ORDER_IDs) or (
-            orig_client_order_id.getValue()
-            not in CLIENT_ORDER_IDs[sessionID.toString()]
-        ):
+        if orig_order is None:
             execution_report = self._create_execution_report(
+                sessionID,
                 symbol,
                 side,
                 client_order_id,
                 price=price,
                 quantity=quantity,
-                text=f"Client order ID {client_order_id.getValue()} not found.",
+                order_quantity=quantity,
+                text=f"Client order ID {client_order_id} not found.",
                 exec_type=fix.ExecType_REJECTED,
                 reject_reason=fix.OrdRejReason_UNKNOWN_ORDER,
             )
             return [(sessionID, execution_report)]
 
-        if sessionID.toString() in CLIENT_ORDER_IDs:
-            CLIENT_ORDER_IDs[sessionID.toString()].append(client_order_id.getValue())
-        else:
-            CLIENT_ORDER_IDs[sessionID.toString()] = [client_order_id.getValue()]
-
-        execution_reports = []
+        if orig_order.symbol != symbol:
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                price=price,
+                quantity=quantity,
+                order_quantity=quantity,
+                text=f"Client order ID {orig_client_order_id} is not a {symbol} order.",
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_UNKNOWN_ORDER,
+                order_id=orig_order.order_id,
+            )
+            return [(sessionID, execution_report)]
 
-        order_side = "b" if side.getValue() == "1" else "s"
-        order = Order(
-            symbol.getValue(),
-            price.getValue(),
-            quantity.getValue(),
-            order_side,
-            int(order_type.getValue()),
-            client_order_id.getValue(),
-            sessionID,
+        # the replacement keeps the exchange order ID of the original, and is
+        # registered before matching as its fills are booked against it
+        order = self._make_order(
+            symbol, price, quantity, side, order_type, client_order_id, sessionID
         )
+        order_state = OrderState(orig_order.order_id, symbol, side, quantity)
+        if not self.state.orders.add(session, client_order_id, order_state):
+            if self.pool is not None:
+                self.pool.release(order)
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                price=price,
+                quantity=quantity,
+                order_quantity=quantity,
+                text=f"Client order ID {client_order_id} already in use.",
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_DUPLICATE_ORDER,
+                order_id=orig_order.order_id,
+            )
+            return [(sessionID, execution_report)]
 
-        MARKETS[market].replace_order(orig_client_order_id.getValue(), order)
+        execution_reports = []
+
+        book = self.state.markets[market]
+        # read before matching, a filled order may go back to the pool
+        aggressor = order.side
+        trades = book.replace_order(orig_client_order_id, order)
         self.logger.debug("Processed replace order.")
 
-        if MARKETS[market].trades.qsize() == 0:
+        if isinstance(trades, str):
+            self.state.orders.pop(session, client_order_id)
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                price=price,
+                quantity=quantity,
+                order_quantity=quantity,
+                text=trades,
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_UNKNOWN_ORDER,
+                order_id=order_state.order_id,
+            )
+            return [(sessionID, execution_report)]
+
+        self.state.orders.pop(session, orig_client_order_id)
+
+        if not trades:
             self.logger.debug("No trades.")
             execution_report = self._create_execution_report(
+                sessionID,
                 symbol,
                 side,
                 client_order_id,
                 price=price,
                 quantity=quantity,
+                order_quantity=quantity,
                 exec_type=fix.ExecType_REPLACED,
                 orig_client_order_id=orig_client_order_id,
+                order_id=order_state.order_id,
+                leaves_quantity=quantity,
             )
             execution_reports.append((sessionID, execution_report))
-            FLUSH_BOOK[market] = []
+            self.state.book_changed(market)
         else:
-            while not MARKETS[market].trades.empty():
-                trade = MARKETS[market].trades.get()
+            flush_trades = self.state.book_changed(market)
+            for trade in trades:
                 execution_report = self._handle_trade(symbol, trade, sessionID)
 
-                if FLUSH_BOOK[market]:
-                    FLUSH_BOOK[market].append((trade.price, trade.quantity))
-                else:
-                    FLUSH_BOOK[market] = [(trade.price, trade.quantity)]
+                # both sides of a fill are reported, it is published once
+                if trade.side == aggressor:
+                    flush_trades.append((trade.price, trade.quantity))
 
                 if execution_report:
                     execution_reports.append((trade.session, execution_report))
 
-        return execution_reports
+                if self.pool is not None:
+                    self.pool.release(trade)
 
-    def order_cancel(self, message, sessionID):
-        self.logger.debug("Inside order delete.")
+        if client_order_id not in book.live_order_ids:
+            self.state.orders.pop(session, client_order_id)
 
-        orig_client_order_id = fix.OrigClOrdID()
-        message.getField(orig_client_order_id)
-
-        symbol = fix.Symbol()
-        message.getField(symbol)
+        return execution_reports
 
-        side = fix.Side()
-        message.getField(side)
+    def order_cancel(self, fields, sessionID):
+        self.logger.debug("Inside order delete.")
 
-        client_order_id = fix.ClOrdID()
-        message.getField(client_order_id)
+        symbol, client_order_id, side, orig_client_order_id = fields
 
         execution_report = None
-        market = symbol.getValue()
+        market = symbol
 
-        if market not in MARKETS:
+        if market not in self.state.markets:
             execution_report = self._create_execution_report(
+                sessionID,
                 symbol,
                 side,
                 client_order_id,
-                text=f"Symbol {symbol.getValue()} not found.",
+                text=f"Symbol {symbol} not found.",
                 exec_type=fix.ExecType_REJECTED,
                 reject_reason=fix.OrdRejReason_UNKNOWN_SYMBOL,
             )
             return [(sessionID, execution_report)]
 
-        self.logger.debug(CLIENT_ORDER_IDs)
+        session = sessionID.toString()
+        orig_order = self.state.orders.get(session, orig_client_order_id)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Cancelling {orig_client_order_id}: {orig_order}")
 
-        if (sessionID.toString() not in CLIENT_ORDER_IDs) or (
-            orig_client_order_id.getValue()
-            not in CLIENT_ORDER_IDs[sessionID.toString()]
-        ):
+        if orig_order is None:
             execution_report = self._create_execution_report(
+                sessionID,
                 symbol,
                 side,
                 client_order_id,
-                text=f"Client order ID {client_order_id.getValue()} not found.",
+                text=f"Client order ID {client_order_id} not found.",
                 exec_type=fix.ExecType_REJECTED,
                 reject_reason=fix.OrdRejReason_UNKNOWN_ORDER,
             )
             return [(sessionID, execution_report)]
 
-        CLIENT_ORDER_IDs[sessionID.toString()].remove(orig_client_order_id.getValue())
+        if orig_order.symbol != symbol:
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                text=f"Client order ID {orig_client_order_id} is not a {symbol} order.",
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_UNKNOWN_ORDER,
+                order_id=orig_order.order_id,
+            )
+            return [(sessionID, execution_report)]
 
         execution_reports = []
 
-        MARKETS[market].delete_order(orig_client_order_id.getValue())
+        result = self.state.markets[market].delete_order(orig_client_order_id)
         self.logger.debug("Processed delete order.")
 
-        FLUSH_BOOK[market] = []
+        if result:
+            execution_report = self._create_execution_report(
+                sessionID,
+                symbol,
+                side,
+                client_order_id,
+                text=result,
+                exec_type=fix.ExecType_REJECTED,
+                reject_reason=fix.OrdRejReason_UNKNOWN_ORDER,
+                order_id=orig_order.order_id,
+            )
+            return [(sessionID, execution_report)]
+
+        self.state.orders.pop(session, orig_client_order_id)
+        self.state.book_changed(market)
 
         execution_report = self._create_execution_report(
+            sessionID,
             symbol,
             side,
             client_order_id,
             orig_client_order_id=orig_client_order_id,
-            exec_type=fix.ExecType_CANCELLED,
+            exec_type=fix.ExecType_CANCELED,
+            order_id=orig_order.order_id,
         )
 
         execution_reports.append((sessionID, execution_report))
@@ -406,23 +861,17 @@ class MessageBroker(BaseApplication):
         return execution_reports
 
     def generate_order_id(self, symbol):
-        if symbol in ORDER_IDs:
-            _id = ORDER_IDs[symbol]
-        else:
-            _id = 1
-
-        ORDER_IDs[symbol] = _id + 1
+        order_ids = self.state.order_ids
+        _id = order_ids.get(symbol, 1)
+        order_ids[symbol] = _id + 1
         order_id = symbol + "_O_" + f"{_id:06}"
 
         return order_id
 
     def generate_execution_id(self, symbol):
-        if symbol in EXECUTION_IDs:
-            _id = EXECUTION_IDs[symbol]
-        else:
-            _id = 1
-
-        EXECUTION_IDs[symbol] = _id + 1
+        execution_ids = self.state.execution_ids
+        _id = execution_ids.get(symbol, 1)
+        execution_ids[symbol] = _id + 1
         execution_id = symbol + "_E_" + f"{_id:06}"
 
         return execution_id
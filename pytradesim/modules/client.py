@@ -1,3 +1,5 @@
+import logging
+
 import quickfix as fix
 import quickfix42 as fix42
 
@@ -5,6 +7,10 @@ from .utils import Message
 
 ORDERS = {}
 
+# quickfix 1.16 renamed HandlInst_MANUAL_ORDER_BEST_EXECUTION, so the value
+# is spelled out to work with either version
+HANDL_INST_MANUAL_ORDER = "3"
+
 
 class BaseApplication(fix.Application):
     def onCreate(self, sessionID):
@@ -50,10 +56,12 @@ class Client(BaseApplication):
         return
 
     def toApp(self, message, sessionID):
-        self.logger.debug(f"Sending {message} session {sessionID}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Sending {message} session {sessionID}")
 
     def fromApp(self, message, sessionID):
-        self.logger.info(f"Got message {message} for {sessionID}.")
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(f"Got message {message} for {sessionID}.")
         self.process(message, sessionID)
 
     def process(self, message, sessionID):
@@ -75,10 +83,11 @@ class Client(BaseApplication):
                     trade_exec_id,
                     order_status,
                 ) = self.__get_attributes(message)
-                self.logger.info(
-                    f"Trade: {trade_exec_id}, {client_order_id} {symbol}"
-                    f" {quantity}@{price} {side}"
-                )
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info(
+                        f"Trade: {trade_exec_id}, {client_order_id} {symbol}"
+                        f" {quantity}@{price} {side}"
+                    )
             elif exectype.getValue() == "0":
                 self.logger.info("Order placed successfully.")
                 (
@@ -93,10 +102,11 @@ class Client(BaseApplication):
 
                 ORDERS[client_order_id.getValue()] = [symbol, price, quantity, side]
 
-                self.logger.info(
-                    f"Order: {exec_id}, {client_order_id} {symbol}"
-                    f" {quantity}@{price} {side}"
-                )
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info(
+                        f"Order: {exec_id}, {client_order_id} {symbol}"
+                        f" {quantity}@{price} {side}"
+                    )
             elif exectype.getValue() == "5":
                 self.logger.info("Order replaced successfully.")
                 (
@@ -111,10 +121,11 @@ class Client(BaseApplication):
 
                 ORDERS[client_order_id.getValue()] = [symbol, price, quantity, side]
 
-                self.logger.info(
-                    f"Order: {exec_id}, {client_order_id} {symbol}"
-                    f" {quantity}@{price} {side}"
-                )
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info(
+                        f"Order: {exec_id}, {client_order_id} {symbol}"
+                        f" {quantity}@{price} {side}"
+                    )
 
     def __get_attributes(self, message):
         price = fix.LastPx()
@@ -171,7 +182,7 @@ def new_order(
         message.setField(fix.OrdType(fix.OrdType_MARKET))
     else:
         message.setField(fix.OrdType(fix.OrdType_LIMIT))
-    message.setField(fix.HandlInst(fix.HandlInst_MANUAL_ORDER_BEST_EXECUTION))
+    message.setField(fix.HandlInst(HANDL_INST_MANUAL_ORDER))
     message.setField(fix.TransactTime())
     message.setField(fix.OrderQty(float(quantity)))
     message.setField(fix.Text(f"{side} {symbol} {quantity}@{price}"))
@@ -196,7 +207,7 @@ def replace_order(
     message.setField(fix.Side(side))
     message.setField(fix.Price(float(price)))
     message.setField(fix.OrdType(fix.OrdType_LIMIT))
-    message.setField(fix.HandlInst(fix.HandlInst_MANUAL_ORDER_BEST_EXECUTION))
+    message.setField(fix.HandlInst(HANDL_INST_MANUAL_ORDER))
     message.setField(fix.TransactTime())
     message.setField(fix.TransactTime())
     message.setField(fix.OrderQty(float(quantity)))
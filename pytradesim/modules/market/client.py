@@ -1,3 +1,5 @@
+import logging
+
 import quickfix as fix
 import quickfix42 as fix42
 
@@ -14,6 +16,7 @@ class MarketDataClient(BaseApplication):
 
     def onCreate(self, sessionID):
         self.__count = 0
+        self.books = {}
         self.logger.info(f"Successfully created session {sessionID}.")
         return
 
@@ -26,10 +29,12 @@ class MarketDataClient(BaseApplication):
         return
 
     def toApp(self, message, sessionID):
-        self.logger.debug(f"Sending {message} session {sessionID}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Sending {message} session {sessionID}")
 
     def fromApp(self, message, sessionID):
-        self.logger.info(f"Got message {message} for {sessionID}.")
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(f"Got message {message} for {sessionID}.")
         self.show(message)
 
     def show(self, message):
@@ -70,10 +75,61 @@ class MarketDataClient(BaseApplication):
                 elif entry_type.getValue() == "2":
                     _trades.append((entry_px.getValue(), entry_size.getValue()))
 
+            self.books[instrument] = (dict(_bids), dict(_asks))
+
             book = Book(instrument, _bids, _asks, _trades)
 
             print(book)
 
+        elif msgtype.getValue() == "X":
+            update_action = fix.MDUpdateAction()
+            entry_type = fix.MDEntryType()
+            entry_px = fix.MDEntryPx()
+            entry_size = fix.MDEntrySize()
+            symbol = fix.Symbol()
+            entries = fix.NoMDEntries()
+
+            message.getField(entries)
+
+            group = fix42.MarketDataIncrementalRefresh().NoMDEntries()
+            changed = {}
+
+            for i in range(entries.getValue()):
+                message.getGroup(i + 1, group)
+                group.getField(update_action)
+                group.getField(entry_type)
+                group.getField(symbol)
+                group.getField(entry_px)
+                group.getField(entry_size)
+
+                instrument = symbol.getValue()
+                if instrument not in self.books:
+                    continue
+                bids, asks, trades = changed.setdefault(
+                    instrument, self.books[instrument] + ([],)
+                )
+                price = entry_px.getValue()
+
+                if entry_type.getValue() == "2":
+                    trades.append((price, entry_size.getValue()))
+                    continue
+
+                levels = bids if entry_type.getValue() == "0" else asks
+                if update_action.getValue() == fix.MDUpdateAction_DELETE:
+                    levels.pop(price, None)
+                else:
+                    levels[price] = entry_size.getValue()
+
+            for instrument, (bids, asks, trades) in changed.items():
+                book = Book(
+                    instrument,
+                    sorted(bids.items(), reverse=True),
+                    sorted(asks.items()),
+                    trades,
+                )
+
+                print(book)
+
     def market_data_request(self, sender_comp_id, target_comp_id, symbols):
         md_types = [fix.MDEntryType_BID, fix.MDEntryType_OFFER, fix.MDEntryType_TRADE]
 
@@ -0,0 +1,158 @@
+"""Binary encoding of books sent from the exchange to the market data server.
+
+Every message starts with a fixed little-endian header::
+
+    version  B   format version, VERSION
+    kind     B   SNAPSHOT or UPDATE
+    length   B   length of the UTF-8 symbol that follows the header
+    pad      x
+    sequence I   sequence number of the snapshot or update
+    first    I   snapshot: no.of bid levels, update: no.of level changes
+    second   I   snapshot: no.of ask levels, update: 0
+    trades   I   no.of trades
+
+followed by the symbol and then the entries. Bid and ask levels and trades
+are ``<dd`` price and size pairs. Level changes are ``<BBddI`` action
+(new, change, delete), side (bid, ask), price, size and 1-based level.
+
+Only :mod:`struct` is needed to read it, so consumers do not have to import
+the matching engine or unpickle Python objects.
+"""
+
+import struct
+from itertools import chain
+from multiprocessing.connection import BufferTooShort
+
+VERSION = 1
+
+SNAPSHOT = 0
+UPDATE = 1
+
+HEADER = struct.Struct("<BBBxIIII")
+LEVEL = struct.Struct("<dd")
+CHANGE = struct.Struct("<BBddI")
+
+ACTIONS = ("new", "change", "delete")
+SIDES = ("b", "s")
+
+_ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+_SIDE_CODES = {side: code for code, side in enumerate(SIDES)}
+
+
+def _pack_levels(levels):
+    return struct.pack(f"<{2 * len(levels)}d", *chain.from_iterable(levels))
+
+
+def encode(book):
+    """Encode a ``Book`` snapshot or a ``BookUpdate`` to bytes."""
+    symbol = book.symbol.encode()
+    changes = getattr(book, "changes", None)
+
+    if changes is None:
+        header = HEADER.pack(
+            VERSION,
+            SNAPSHOT,
+            len(symbol),
+            book.sequence,
+            len(book.bids),
+            len(book.asks),
+            len(book.trades),
+        )
+        return b"".join(
+            (
+                header,
+                symbol,
+                _pack_levels(book.bids),
+                _pack_levels(book.asks),
+                _pack_levels(book.trades),
+            )
+        )
+
+    header = HEADER.pack(
+        VERSION, UPDATE, len(symbol), book.sequence, len(changes), 0, len(book.trades)
+    )
+    pack = CHANGE.pack
+    return b"".join(
+        (
+            header,
+            symbol,
+            *(
+                pack(_ACTION_CODES[action], _SIDE_CODES[side], price, size, level)
+                for action, side, price, size, level in changes
+            ),
+            _pack_levels(book.trades),
+        )
+    )
+
+
+def decode(data, snapshot, update):
+    """Decode a message, building the result with ``snapshot`` or ``update``.
+
+    They are called like ``Book`` and ``BookUpdate``. ``data`` may be a
+    ``memoryview`` over a reused buffer, only the bytes of one message are
+    read from it.
+    """
+    version, kind, length, sequence, first, second, trades = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported book encoding version {version}.")
+
+    start = HEADER.size
+    offset = start + length
+    symbol = bytes(data[start:offset]).decode()
+
+    if kind == SNAPSHOT:
+        bids = _unpack_levels(data, offset, first)
+        offset += first * LEVEL.size
+        asks = _unpack_levels(data, offset, second)
+        offset += second * LEVEL.size
+        return snapshot(
+            symbol, bids, asks, _unpack_levels(data, offset, trades), sequence
+        )
+
+    if kind == UPDATE:
+        end = offset + first * CHANGE.size
+        changes = [
+            (ACTIONS[action], SIDES[side], price, size, level)
+            for action, side, price, size, level in CHANGE.iter_unpack(data[offset:end])
+        ]
+        return update(symbol, changes, _unpack_levels(data, end, trades), sequence)
+
+    raise ValueError(f"Unknown book message kind {kind}.")
+
+
+def _unpack_levels(data, offset, count):
+    end = offset + count * LEVEL.size
+    return list(LEVEL.iter_unpack(data[offset:end]))
+
+
+class BookReader:
+    """Receives encoded books from a connection into one reused buffer.
+
+    The buffer grows when a message does not fit and is then kept at that
+    size.
+    """
+
+    def __init__(self, conn, snapshot, update, size=65536):
+        self.conn = conn
+        self.snapshot = snapshot
+        self.update = update
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.size = 0
+
+    def payload(self):
+        """Return the last message received, valid until the next ``recv``."""
+        return self.view[: self.size]
+
+    def recv(self):
+        try:
+            size = self.conn.recv_bytes_into(self.buffer)
+        except BufferTooShort as error:
+            message = error.args[0]
+            self.buffer = bytearray(len(message) * 2)
+            self.view = memoryview(self.buffer)
+            size = len(message)
+            self.buffer[:size] = message
+
+        self.size = size
+        return decode(self.view[:size], self.snapshot, self.update)
@@ -0,0 +1,295 @@
+"""Sequenced UDP book feed with a TCP retransmission and snapshot service.
+
+The market data server sends every book it gets from the exchange as one
+datagram, to a unicast address or a multicast group. Any number of readers
+can join a multicast group for the cost of one send. Datagrams are laid out
+like MoldUDP64 packets, little-endian::
+
+    session  10s  feed session name, space padded
+    sequence Q    feed sequence number of the first message
+    count    H    no.of messages, 0 for a heartbeat
+    messages      each a ``<H`` length and a payload encoded by ``codec``
+
+A heartbeat carries the next sequence number, so a reader also notices lost
+messages when the feed goes quiet.
+
+A reader that sees a gap asks the TCP service for the missed messages. If
+they are no longer kept it asks for a snapshot, which is a packet of
+``Book`` payloads whose sequence is the first feed message not included.
+Requests are ``<cQH`` kind, sequence and count. Each reply is a packet
+framed by its ``<I`` length.
+
+Messages are limited by the size of a datagram to ``MAX_MESSAGE`` bytes.
+:meth:`FeedPublisher.publish` refuses larger ones before they take a
+sequence number, and snapshots leave them out.
+"""
+
+import ipaddress
+import socket
+import socketserver
+import struct
+import threading
+from collections import deque
+
+PACKET = struct.Struct("<10sQH")
+LENGTH = struct.Struct("<H")
+REQUEST = struct.Struct("<cQH")
+FRAME = struct.Struct("<I")
+
+RETRANSMIT = b"R"
+SNAPSHOT = b"S"
+
+# the count of a request, larger gaps are recovered with a snapshot
+MAX_RETRANSMIT = 0xFFFF
+
+# the largest UDP payload over IPv4, less the packet header and one length
+MAX_DATAGRAM = 65507
+MAX_MESSAGE = MAX_DATAGRAM - PACKET.size - LENGTH.size
+
+
+def pack(session, sequence, messages):
+    parts = [PACKET.pack(session, sequence, len(messages))]
+    for message in messages:
+        parts.append(LENGTH.pack(len(message)))
+        parts.append(message)
+    return b"".join(parts)
+
+
+def unpack(data):
+    """Return the session, first sequence number and messages of a packet."""
+    session, sequence, count = PACKET.unpack_from(data)
+    offset = PACKET.size
+    messages = []
+
+    for _ in range(count):
+        (length,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        end = offset + length
+        messages.append(bytes(data[offset:end]))
+        offset = end
+
+    return session, sequence, messages
+
+
+def _is_multicast(host):
+    try:
+        return ipaddress.ip_address(host).is_multicast
+    except ValueError:
+        return False
+
+
+class FeedPublisher:
+    """Sends messages to ``address`` and keeps the last ``history`` of them
+    for retransmission."""
+
+    def __init__(
+        self,
+        address,
+        interface="127.0.0.1",
+        ttl=1,
+        session=b"PYTRADESIM",
+        history=10000,
+    ):
+        self.address = address
+        self.session = session.ljust(10)[:10]
+        self.sequence = 0
+        self.history = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.server = None
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if _is_multicast(address[0]):
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+            self.sock.setsockopt(
+                socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface)
+            )
+
+    def publish(self, message):
+        """Send a message and return its sequence number.
+
+        ``message`` may be a view of a reused buffer, a copy is kept. A
+        ValueError is raised for a message over ``MAX_MESSAGE`` bytes.
+        """
+        message = bytes(message)
+        if len(message) > MAX_MESSAGE:
+            raise ValueError(
+                f"Message of {len(message)} bytes is over the feed limit of "
+                f"{MAX_MESSAGE} bytes."
+            )
+
+        with self.lock:
+            sequence = self.sequence + 1
+            self.history.append(message)
+            self.sequence = sequence
+        self.sock.sendto(pack(self.session, sequence, [message]), self.address)
+        return sequence
+
+    def heartbeat(self):
+        with self.lock:
+            sequence = self.sequence + 1
+        self.sock.sendto(pack(self.session, sequence, []), self.address)
+
+    def messages(self, sequence, count):
+        """Return the first kept sequence number from ``sequence`` on, and up
+        to ``count`` messages starting there."""
+        with self.lock:
+            oldest = self.sequence - len(self.history) + 1
+            first = max(sequence, oldest)
+            start = first - oldest
+            stop = min(start + count - (first - sequence), len(self.history))
+            return first, [self.history[i] for i in range(start, stop)]
+
+    def serve(self, port, snapshot, host="localhost"):
+        """Start the TCP service on a thread of its own.
+
+        ``snapshot`` is called from that thread and returns the sequence
+        number of the first message it does not cover and encoded ``Book``
+        snapshots. It must not race with :meth:`publish`. Books over
+        ``MAX_MESSAGE`` bytes are left out of the reply.
+        """
+        self.server = RetransmitServer((host, port), self, snapshot)
+        thread = threading.Thread(
+            target=self.server.serve_forever, name="retransmit", daemon=True
+        )
+        thread.start()
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.sock.close()
+
+
+class RetransmitHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        reader = self.request.makefile("rb")
+
+        while True:
+            request = reader.read(REQUEST.size)
+            if len(request) < REQUEST.size:
+                return
+
+            kind, sequence, count = REQUEST.unpack(request)
+            if kind == RETRANSMIT:
+                sequence, messages = self.server.feed.messages(sequence, count)
+            elif kind == SNAPSHOT:
+                sequence, messages = self.server.snapshot()
+                messages = [
+                    message for message in messages if len(message) <= MAX_MESSAGE
+                ]
+            else:
+                return
+
+            packet = pack(self.server.feed.session, sequence, messages)
+            self.request.sendall(FRAME.pack(len(packet)) + packet)
+
+
+class RetransmitServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, feed, snapshot):
+        self.feed = feed
+        self.snapshot = snapshot
+        super().__init__(address, RetransmitHandler)
+
+
+class FeedReceiver:
+    """Receives the feed and hands back its messages in sequence order.
+
+    Gaps are filled from the retransmission service at ``retransmit``, or
+    with a snapshot when the missed messages are gone. Call :meth:`snapshot`
+    before the first :meth:`recv` to start from a full set of books.
+    """
+
+    def __init__(self, address, retransmit, interface="127.0.0.1"):
+        self.retransmit = retransmit
+        self.conn = None
+        self.next = None
+        self.retransmitted = 0
+        self.snapshots = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if _is_multicast(address[0]):
+            self.sock.bind(("", address[1]))
+            membership = socket.inet_aton(address[0]) + socket.inet_aton(interface)
+            self.sock.setsockopt(
+                socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership
+            )
+        else:
+            self.sock.bind(address)
+
+    def request(self, kind, sequence=0, count=0):
+        if self.conn is None:
+            self.conn = socket.create_connection(self.retransmit)
+            self.replies = self.conn.makefile("rb")
+
+        self.conn.sendall(REQUEST.pack(kind, sequence, count))
+        frame = self.replies.read(FRAME.size)
+        if len(frame) == FRAME.size:
+            (length,) = FRAME.unpack(frame)
+            packet = self.replies.read(length)
+            if len(packet) == length:
+                _, first, messages = unpack(packet)
+                return first, messages
+
+        # reconnect on the next request
+        self.replies.close()
+        self.conn.close()
+        self.conn = None
+        raise ConnectionError("Retransmission service closed the connection.")
+
+    def snapshot(self):
+        self.next, messages = self.request(SNAPSHOT)
+        self.snapshots += 1
+        return messages
+
+    def recv(self, timeout=None):
+        """Wait for a datagram and return the messages it completes.
+
+        The result is empty on a timeout or a heartbeat that shows no gap. A
+        snapshot fetched to recover from a gap is returned as its ``Book``
+        payloads followed by any newer messages.
+        Raises ConnectionError when the retransmission service cannot be
+        reached for a snapshot.
+        """
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(65535)
+        except socket.timeout:
+            return []
+
+        _, sequence, messages = unpack(data)
+        if self.next is None:
+            self.next = sequence
+
+        result = []
+        if sequence > self.next:
+            missed = sequence - self.next
+            retransmitted = []
+            if missed <= MAX_RETRANSMIT:
+                try:
+                    first, retransmitted = self.request(RETRANSMIT, self.next, missed)
+                except ConnectionError:
+                    pass
+            if retransmitted and first == self.next and len(retransmitted) == missed:
+                result.extend(retransmitted)
+                self.next = sequence
+                self.retransmitted += missed
+            else:
+                result.extend(self.snapshot())
+
+        skip = self.next - sequence
+        if 0 <= skip < len(messages):
+            result.extend(messages[skip:])
+            self.next = sequence + len(messages)
+
+        return result
+
+    def close(self):
+        if self.conn is not None:
+            self.replies.close()
+            self.conn.close()
+        self.sock.close()
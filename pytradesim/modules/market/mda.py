@@ -1,16 +1,37 @@
+import logging
+
 import quickfix as fix
 import quickfix42 as fix42
 
-from .utils import BaseApplication
+from .utils import BaseApplication, Book, BookUpdate
+
+UPDATE_ACTIONS = {
+    "new": fix.MDUpdateAction_NEW,
+    "change": fix.MDUpdateAction_CHANGE,
+    "delete": fix.MDUpdateAction_DELETE,
+}
+
+ENTRY_TYPES = {"b": fix.MDEntryType_BID, "s": fix.MDEntryType_OFFER}
 
 
 class MarketDataAdapter(BaseApplication):
+    """Publishes books received from the exchange to subscribed sessions.
+
+    A :class:`Book` snapshot is sent as a full refresh (35=W) and replaces the
+    adapter's copy of the book. A :class:`BookUpdate` is applied to that copy
+    and sent as an incremental refresh (35=X) carrying its sequence number
+    in RptSeq. New subscribers get a full refresh of the copy.
+    """
+
     def set_logging(self, logger):
         self.logger = logger
 
     def onCreate(self, sessionID):
         self.sessions = set()
         self.clients = {}
+        self.books = {}
+        self.sequences = {}
+        self.recovering = set()
         self.logger.info(f"Successfully created sessions {sessionID}.")
 
     def onLogon(self, sessionID):
@@ -23,7 +44,8 @@ class MarketDataAdapter(BaseApplication):
         return
 
     def toApp(self, message, sessionID):
-        self.logger.debug(f"Sending via {sessionID} : {message}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Sending via {sessionID} : {message}")
 
     def fromApp(self, message, sessionID):
         responses = self.process(message, sessionID)
@@ -32,21 +54,25 @@ class MarketDataAdapter(BaseApplication):
             for response in responses:
                 if isinstance(response[1], fix.Message):
                     try:
-                        msg = response[1].__str__()
-                        msg = msg.replace("\x01", "|")
-                        self.logger.debug(f"Sending: {msg}")
+                        if self.logger.isEnabledFor(logging.DEBUG):
+                            msg = response[1].__str__()
+                            msg = msg.replace("\x01", "|")
+                            self.logger.debug(f"Sending: {msg}")
                         fix.Session.sendToTarget(response[1], response[0])
                     except fix.SessionNotFound as error:
                         raise fix.SessionNotFound(error)
         return
 
     def process(self, message, sessionID):
+        responses = None
         msgtype = fix.MsgType()
         message.getHeader().getField(msgtype)
 
-        self.logger.debug(f"Processing message: {message}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Processing message: {message}")
         if msgtype.getValue() == "V":
-            self.logger.info(f"Incoming MD request {sessionID}. Processing...")
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(f"Incoming MD request {sessionID}. Processing...")
             responses = self.market_data_request(message, sessionID)
 
         return responses
@@ -56,19 +82,28 @@ class MarketDataAdapter(BaseApplication):
         no_related_symbols = fix42.MarketDataRequest().NoRelatedSym()
         message.getField(no_of_symbols)
         symbol = fix.Symbol()
+        responses = []
 
         for i in range(no_of_symbols.getValue()):
             message.getGroup(i + 1, no_related_symbols)
             no_related_symbols.getField(symbol)
             sym = symbol.getValue()
 
-            self.logger.debug(f"Got request for symbol {sym} from {sessionID}.")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Got request for symbol {sym} from {sessionID}.")
 
             if sym in self.clients:
                 self.clients[sym].append(sessionID)
             else:
                 self.clients[sym] = [sessionID]
 
+            if sym in self.books:
+                book = self.book(sym)
+                snapshot = self.__snapshot(sym, book.bids, book.asks, [])
+                responses.append((sessionID, snapshot))
+
+        return responses
+
     def __remove_client(self, message, sessionID):
         no_of_symbols = fix.NoRelatedSym()
         no_related_symbols = fix42.MarketDataRequest.NoRelatedSym()
@@ -92,14 +127,97 @@ class MarketDataAdapter(BaseApplication):
             self.__remove_client(message, sessionID)
         else:
             # add client
-            self.__add_client(message, sessionID)
+            return self.__add_client(message, sessionID)
+
+    def book(self, symbol):
+        """Return the adapter's copy of a book as a :class:`Book` snapshot."""
+        bids, asks = self.books[symbol]
+        return Book(
+            symbol,
+            sorted(bids.items(), reverse=True),
+            sorted(asks.items()),
+            [],
+            self.sequences[symbol],
+        )
 
     def dispatch(self, book):
+        """Publish a snapshot or update, return True if a snapshot is needed.
+
+        An update that does not follow on from the last sequence number seen
+        for its symbol is dropped, and so are the ones after it until the next
+        snapshot arrives.
+        """
+        if isinstance(book, BookUpdate):
+            return self.__dispatch_update(book)
+
         symbol = book.symbol
-        bids = book.bids
-        asks = book.asks
-        trades = book.trades
+        self.books[symbol] = (dict(book.bids), dict(book.asks))
+        self.sequences[symbol] = book.sequence
+        self.recovering.discard(symbol)
+
+        message = self.__snapshot(symbol, book.bids, book.asks, book.trades)
+        self.__publish(symbol, message)
+        return False
+
+    def __dispatch_update(self, update):
+        symbol = update.symbol
+
+        if symbol in self.recovering:
+            return False
+
+        if symbol not in self.books or update.sequence != self.sequences[symbol] + 1:
+            self.logger.warning(
+                f"{symbol} update {update.sequence} out of sequence, "
+                f"requesting a snapshot."
+            )
+            self.recovering.add(symbol)
+            return True
 
+        self.sequences[symbol] = update.sequence
+        levels = {"b": self.books[symbol][0], "s": self.books[symbol][1]}
+
+        message = fix42.MarketDataIncrementalRefresh()
+
+        for action, side, price, size, level in update.changes:
+            if action == "delete":
+                levels[side].pop(price, None)
+            else:
+                levels[side][price] = size
+
+            group = fix42.MarketDataIncrementalRefresh().NoMDEntries()
+            group.setField(fix.MDUpdateAction(UPDATE_ACTIONS[action]))
+            group.setField(fix.MDEntryType(ENTRY_TYPES[side]))
+            group.setField(fix.Symbol(symbol))
+            group.setField(fix.MDEntryPx(float(price)))
+            group.setField(fix.MDEntrySize(float(size)))
+            group.setField(fix.MDEntryPositionNo(level))
+            group.setField(fix.RptSeq(update.sequence))
+            message.addGroup(group)
+
+        for price, size in update.trades:
+            group = fix42.MarketDataIncrementalRefresh().NoMDEntries()
+            group.setField(fix.MDUpdateAction(fix.MDUpdateAction_NEW))
+            group.setField(fix.MDEntryType(fix.MDEntryType_TRADE))
+            group.setField(fix.Symbol(symbol))
+            group.setField(fix.MDEntryPx(float(price)))
+            group.setField(fix.MDEntrySize(float(size)))
+            group.setField(fix.RptSeq(update.sequence))
+            message.addGroup(group)
+
+        if update.changes or update.trades:
+            self.__publish(symbol, message)
+        return False
+
+    def __publish(self, symbol, message):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Clients {self.clients}")
+            self.logger.debug(message.__str__().replace("\x01", "|"))
+
+        if symbol in self.clients:
+            for session in self.clients[symbol]:
+                fix.Session.sendToTarget(message, session)
+
+    def __snapshot(self, symbol, bids, asks, trades):
         message = fix42.MarketDataSnapshotFullRefresh()
 
         message.setField(fix.Symbol(symbol))
@@ -127,10 +245,4 @@ class MarketDataAdapter(BaseApplication):
                 group.setField(fix.MDEntrySize(float(trades[i][1])))
                 message.addGroup(group)
 
-        self.logger.debug(f"Clients {self.clients}")
-
-        print(message.__str__().replace("\x01", "|"))
-
-        if symbol in self.clients:
-            for session in self.clients[symbol]:
-                fix.Session.sendToTarget(message, session)
+        return message
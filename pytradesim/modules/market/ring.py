@@ -0,0 +1,181 @@
+"""Single-producer, multi-consumer ring buffer in shared memory.
+
+The exchange publishes encoded books into a ring of fixed-size slots and any
+number of processes attach to it by name and read at their own pace. Readers
+never write to the shared memory, so adding one costs the producer nothing.
+
+Layout, little-endian::
+
+    0   magic    4s  MAGIC
+    4   version  I   VERSION
+    8   slots    I   no.of slots
+    12  size     I   bytes per slot, slot header included
+    16  cursor   Q   sequence number of the last published message
+    64  slots    slot ``i`` holds message ``n`` when ``n % slots == i``
+
+and each slot::
+
+    0   sequence Q   sequence number of the message, 0 while it is written
+    8   length   I   payload length
+    16  payload
+
+Sequence numbers start at 1. A reader that falls more than ``slots`` messages
+behind has been lapped: the messages it missed are gone and it skips to the
+oldest one still in the ring, counting the gap in ``RingReader.lost``.
+
+Ordering relies on the slot sequence being written after the payload and the
+cursor after the slot, which holds on x86 where stores are not reordered.
+"""
+
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+MAGIC = b"PTRB"
+VERSION = 1
+
+HEADER = struct.Struct("<4sIII")
+CURSOR = struct.Struct("<Q")
+CURSOR_OFFSET = 16
+SLOTS_OFFSET = 64
+
+SLOT = struct.Struct("<QI")
+SLOT_HEADER = 16
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 attaching registers the segment with the resource
+        # tracker, which would unlink it when this process exits
+        memory = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+
+class RingBuffer:
+    """A ring created by the producer with :meth:`create` or attached to by a
+    consumer with :meth:`attach`.
+
+    Creating a ring replaces a segment of the same name, if any.
+    """
+
+    def __init__(self, memory, slots, slot_size, owner):
+        self.memory = memory
+        self.buf = memory.buf
+        self.slots = slots
+        self.slot_size = slot_size
+        self.owner = owner
+        self.sequence = self.cursor()
+
+    @classmethod
+    def create(cls, name, slots=1024, slot_size=16384):
+        if slot_size <= SLOT_HEADER:
+            raise ValueError(f"Slot size must be over {SLOT_HEADER} bytes.")
+
+        size = SLOTS_OFFSET + slots * slot_size
+        try:
+            memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a producer that did not exit cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(memory.buf, 0, MAGIC, VERSION, slots, slot_size)
+        CURSOR.pack_into(memory.buf, CURSOR_OFFSET, 0)
+        return cls(memory, slots, slot_size, True)
+
+    @classmethod
+    def attach(cls, name):
+        memory = _attach(name)
+        magic, version, slots, slot_size = HEADER.unpack_from(memory.buf)
+        if magic != MAGIC or version != VERSION:
+            memory.close()
+            raise ValueError(f"{name} is not a version {VERSION} ring buffer.")
+        return cls(memory, slots, slot_size, False)
+
+    def cursor(self):
+        return CURSOR.unpack_from(self.buf, CURSOR_OFFSET)[0]
+
+    def _slot(self, sequence):
+        return SLOTS_OFFSET + (sequence % self.slots) * self.slot_size
+
+    def publish(self, payload):
+        """Write a message and return its sequence number."""
+        length = len(payload)
+        if length > self.slot_size - SLOT_HEADER:
+            raise ValueError(
+                f"Message of {length} bytes does not fit a "
+                f"{self.slot_size} byte slot."
+            )
+
+        sequence = self.sequence + 1
+        offset = self._slot(sequence)
+        start = offset + SLOT_HEADER
+        end = start + length
+
+        SLOT.pack_into(self.buf, offset, 0, length)
+        self.buf[start:end] = payload
+        SLOT.pack_into(self.buf, offset, sequence, length)
+        CURSOR.pack_into(self.buf, CURSOR_OFFSET, sequence)
+
+        self.sequence = sequence
+        return sequence
+
+    def close(self):
+        self.buf = None
+        self.memory.close()
+        if self.owner:
+            # a reader in this process, or a forked one sharing its resource
+            # tracker, may have unregistered the segment when attaching
+            resource_tracker.register(self.memory._name, "shared_memory")
+            self.memory.unlink()
+
+
+class RingReader:
+    """Reads a ring from ``start``, by default from the next message."""
+
+    def __init__(self, ring, start=None):
+        self.ring = ring
+        self.next = ring.cursor() + 1 if start is None else start
+        self.lost = 0
+
+    def read(self, decode):
+        """Return ``decode`` of the next message, or None if there is none.
+
+        ``decode`` gets a ``memoryview`` of the payload inside the ring, so
+        nothing is copied before decoding. Its result, or its error, is
+        dropped if the producer overwrote the slot meanwhile.
+        """
+        ring = self.ring
+
+        while True:
+            cursor = ring.cursor()
+            if self.next > cursor:
+                return None
+
+            oldest = cursor - ring.slots + 1
+            if self.next < oldest:
+                self.lost += oldest - self.next
+                self.next = oldest
+
+            offset = ring._slot(self.next)
+            sequence, length = SLOT.unpack_from(ring.buf, offset)
+            if sequence == self.next:
+                start = offset + SLOT_HEADER
+                end = start + length
+                with ring.buf[start:end] as payload:
+                    try:
+                        result = decode(payload)
+                    except Exception:
+                        if SLOT.unpack_from(ring.buf, offset)[0] == sequence:
+                            raise
+                        result = None
+                if SLOT.unpack_from(ring.buf, offset)[0] == sequence:
+                    self.next += 1
+                    return result
+
+            # lapped while reading, start again from the oldest message
+            self.lost += 1
+            self.next += 1
@@ -3,11 +3,12 @@ from prettytable import PrettyTable
 
 
 class Book:
-    def __init__(self, symbol, bids, asks, trades):
+    def __init__(self, symbol, bids, asks, trades, sequence=0):
         self.symbol = symbol
         self.bids = bids
         self.asks = asks
         self.trades = trades
+        self.sequence = sequence
 
     def __str__(self):
         table = PrettyTable()
@@ -35,6 +36,32 @@ class Book:
         return ""
 
 
+class BookUpdate:
+    """Level changes of a book since the previous update or snapshot.
+
+    ``changes`` holds ``(action, side, price, size, level)`` tuples from
+    :meth:`Orderbook.level_changes`. ``sequence`` follows on from the last
+    update or :class:`Book` snapshot sent for the symbol.
+    """
+
+    def __init__(self, symbol, changes, trades, sequence):
+        self.symbol = symbol
+        self.changes = changes
+        self.trades = trades
+        self.sequence = sequence
+
+    def __str__(self):
+        lines = [f"Symbol: {self.symbol} update {self.sequence}"]
+
+        for action, side, price, size, level in self.changes:
+            lines.append(f"{action} {side} level {level} {size}@{price}")
+
+        for trade in self.trades:
+            lines.append(f"Trade {self.symbol}, {trade[1]}@{trade[0]}.")
+
+        return "\n".join(lines)
+
+
 class BaseApplication(fix.Application):
     def onCreate(self, sessionID):
         return
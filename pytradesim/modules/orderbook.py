@@ -1,7 +1,11 @@
 import queue
 import time
-from collections import defaultdict
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from decimal import Decimal
 from enum import Enum
+from itertools import islice
+from math import isfinite
 
 from prettytable import PrettyTable
 
@@ -16,58 +20,554 @@ class OrderType(Enum):
     LIMIT = 2
 
 
+class OrderQueue:
+    """FIFO queue of the orders resting at one price.
+
+    The queue is intrusive: orders are linked through their own ``_prev`` and
+    ``_next`` attributes, so an order is unlinked in O(1) from a reference to
+    the order alone, without scanning the level. The aggregate quantity of the
+    level is kept up to date on every insert, fill and removal.
+    """
+
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        self.quantity = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        order = self.head
+        while order is not None:
+            # read ahead so the current order may be removed while iterating
+            next_order = order._next
+            yield order
+            order = next_order
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if 0 <= index < self._count:
+            for position, order in enumerate(self):
+                if position == index:
+                    return order
+        raise IndexError("order queue index out of range")
+
+    def append(self, order):
+        order._prev = self.tail
+        order._next = None
+        if self.tail is None:
+            self.head = order
+        else:
+            self.tail._next = order
+        self.tail = order
+        self.quantity += order.quantity
+        self._count += 1
+
+    def remove(self, order):
+        """Unlink ``order``, return False if it is not in the queue."""
+        if order._prev is None:
+            if self.head is not order:
+                return False
+            self.head = order._next
+        else:
+            order._prev._next = order._next
+
+        if order._next is None:
+            self.tail = order._prev
+        else:
+            order._next._prev = order._prev
+
+        order._prev = order._next = None
+        self.quantity -= order.quantity
+        self._count -= 1
+        return True
+
+    def popleft(self):
+        order = self.head
+        self.head = order._next
+        if self.head is None:
+            self.tail = None
+        else:
+            self.head._prev = None
+
+        order._next = None
+        self.quantity -= order.quantity
+        self._count -= 1
+        return order
+
+
+class PriceLevels(dict):
+    """Price levels for one side of the book, keyed by price.
+
+    Alongside the levels a sorted index of prices is kept, so the best price
+    is read in O(1) and a level is added or dropped with a binary search.
+    Only non-empty levels are stored; reading a missing price gives an empty
+    level.
+
+    When ``changed`` is a set, every price whose level is added to, removed
+    from or dropped is recorded in it.
+    """
+
+    def __init__(self, bid):
+        super().__init__()
+        self.bid = bid
+        self.prices = []
+        self.changed = None
+
+    def __missing__(self, price):
+        return OrderQueue()
+
+    @property
+    def best(self):
+        if self.prices:
+            return self.prices[-1] if self.bid else self.prices[0]
+        return float("-inf") if self.bid else float("inf")
+
+    def best_level(self):
+        if self.prices:
+            return self[self.prices[-1] if self.bid else self.prices[0]]
+
+    def add(self, order):
+        price = order.price
+        if price not in self:
+            self[price] = OrderQueue()
+            insort(self.prices, price)
+        self[price].append(order)
+        if self.changed is not None:
+            self.changed.add(price)
+
+    def remove(self, order):
+        """Unlink a resting order, return False if it is not resting here."""
+        price = order.price
+        level = self.get(price)
+        if level is None or not level.remove(order):
+            return False
+        if not level:
+            self.discard(price)
+        elif self.changed is not None:
+            self.changed.add(price)
+        return True
+
+    def discard(self, price):
+        if self.pop(price, None) is not None:
+            del self.prices[bisect_left(self.prices, price)]
+            if self.changed is not None:
+                self.changed.add(price)
+
+    def position(self, price):
+        """1-based level ``price`` has or would have, counted from the best."""
+        if self.bid:
+            return len(self.prices) - bisect_right(self.prices, price) + 1
+        return bisect_left(self.prices, price) + 1
+
+    def sorted_prices(self):
+        """Prices from best to worst."""
+        return reversed(self.prices) if self.bid else iter(self.prices)
+
+    def depth(self, depth=None):
+        """(price, quantity) of the best ``depth`` levels, all if None."""
+        return [
+            (price, self[price].quantity)
+            for price in islice(self.sorted_prices(), depth)
+        ]
+
+
+# how far from a tick, in ticks, a price may be and still count as on it
+TICK_TOLERANCE = 1e-6
+
+
+class TickLadder:
+    """Price levels for one side of the book on a tick-indexed array.
+
+    Prices are converted to integer tick offsets from the instrument's
+    reference price and levels live in a preallocated list indexed by tick,
+    so two prices on the same tick always share a level. The ladder grows in
+    either direction when a price falls outside it, up to ``band`` ticks from
+    the reference price, and the best level is found by stepping through
+    slots from the previous best.
+
+    Changed prices are recorded in ``changed`` as for :class:`PriceLevels`.
+    """
+
+    def __init__(self, bid, reference_price, ticksize, size=1024, band=1_000_000):
+        if not ticksize > 0:
+            raise ValueError(f"Incorrect tick size {ticksize}, must be positive.")
+
+        self.bid = bid
+        self.reference_price = reference_price
+        self.ticksize = ticksize
+        self.band = band
+        self._decimals = max(
+            -Decimal(str(value)).as_tuple().exponent
+            for value in (reference_price, ticksize, 1)
+        )
+        self._levels = [None] * size
+        self._base = -(size // 2)
+        self._best = None
+        self._count = 0
+        self.changed = None
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, price):
+        return self.get(price) is not None
+
+    def __getitem__(self, price):
+        level = self.get(price)
+        return OrderQueue() if level is None else level
+
+    def tick(self, price):
+        return round((price - self.reference_price) / self.ticksize)
+
+    def in_band(self, price):
+        """Whether ``price`` is within ``band`` ticks of the reference price."""
+        return isfinite(price) and abs(self.tick(price)) <= self.band
+
+    def on_tick(self, price):
+        """Whether ``price`` is on a tick, up to float noise."""
+        offset = (price - self.reference_price) / self.ticksize
+        return abs(offset - round(offset)) < TICK_TOLERANCE
+
+    def snap(self, price):
+        """Price of the tick ``price`` falls on."""
+        return self._price(self.tick(price) - self._base)
+
+    def _price(self, index):
+        return round(
+            self.reference_price + (index + self._base) * self.ticksize,
+            self._decimals,
+        )
+
+    def _index(self, price):
+        if not self.in_band(price):
+            raise ValueError(f"Price {price} is outside the price band.")
+
+        index = self.tick(price) - self._base
+        if index < 0:
+            extra = max(len(self._levels), -index)
+            self._levels[:0] = [None] * extra
+            self._base -= extra
+            if self._best is not None:
+                self._best += extra
+            index += extra
+        elif index >= len(self._levels):
+            self._levels.extend([None] * max(len(self._levels), index + 1))
+        return index
+
+    def get(self, price, default=None):
+        if not isfinite(price):
+            return default
+        index = self.tick(price) - self._base
+        if 0 <= index < len(self._levels) and self._levels[index] is not None:
+            return self._levels[index]
+        return default
+
+    @property
+    def best(self):
+        if self._best is None:
+            return float("-inf") if self.bid else float("inf")
+        return self._price(self._best)
+
+    def best_level(self):
+        if self._best is not None:
+            return self._levels[self._best]
+
+    def add(self, order):
+        index = self._index(order.price)
+        level = self._levels[index]
+        if level is None:
+            level = self._levels[index] = OrderQueue()
+            self._count += 1
+            if (
+                self._best is None
+                or (self.bid and index > self._best)
+                or (not self.bid and index < self._best)
+            ):
+                self._best = index
+        level.append(order)
+        if self.changed is not None:
+            self.changed.add(self._price(index))
+
+    def remove(self, order):
+        """Unlink a resting order, return False if it is not resting here."""
+        level = self.get(order.price)
+        if level is None or not level.remove(order):
+            return False
+        if not level:
+            self.discard(order.price)
+        elif self.changed is not None:
+            self.changed.add(self.snap(order.price))
+        return True
+
+    def discard(self, price):
+        index = self.tick(price) - self._base
+        if not 0 <= index < len(self._levels) or self._levels[index] is None:
+            return
+
+        self._levels[index] = None
+        self._count -= 1
+        if self.changed is not None:
+            self.changed.add(self._price(index))
+
+        if index == self._best:
+            self._best = next(self._indices(), None)
+
+    def position(self, price):
+        """1-based level ``price`` has or would have, counted from the best."""
+        if self._best is None:
+            return 1
+        index = self.tick(price) - self._base
+        if self.bid:
+            start, stop = max(index + 1, 0), self._best + 1
+        else:
+            start, stop = self._best, max(index, 0)
+        return sum(1 for level in islice(self._levels, start, stop) if level) + 1
+
+    def _indices(self):
+        """Slots holding a level, from best to worst."""
+        if self._best is None:
+            return
+        step = -1 if self.bid else 1
+        stop = -1 if self.bid else len(self._levels)
+        levels = self._levels
+        for index in range(self._best, stop, step):
+            if levels[index] is not None:
+                yield index
+
+    def sorted_prices(self):
+        """Prices from best to worst."""
+        return (self._price(index) for index in islice(self._indices(), self._count))
+
+    def depth(self, depth=None):
+        """(price, quantity) of the best ``depth`` levels, all if None."""
+        count = self._count if depth is None else min(depth, self._count)
+        return [
+            (self._price(index), self._levels[index].quantity)
+            for index in islice(self._indices(), count)
+        ]
+
+
+class RecordPool:
+    """Free lists of Order and Trade records for reuse.
+
+    Records handed back with :meth:`release` are reset and returned by
+    :meth:`order` and :meth:`trade` instead of allocating new ones. A released
+    record must no longer be referenced by its owner. Each free list holds at
+    most ``size`` records. A single pop or append per call keeps the free lists
+    safe to share between matching threads.
+    """
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._orders = []
+        self._trades = []
+
+    def order(
+        self, symbol, price, quantity, side, order_type, order_id, session, timestamp
+    ):
+        try:
+            order = self._orders.pop()
+        except IndexError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            return order.reset(
+                symbol, price, quantity, side, order_type, order_id, session, timestamp
+            )
+        return Order.make(
+            symbol, price, quantity, side, order_type, order_id, session, timestamp
+        )
+
+    def trade(
+        self, symbol, quantity, price, side, exec_id, order_id, session, timestamp
+    ):
+        try:
+            trade = self._trades.pop()
+        except IndexError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            return trade.reset(
+                symbol, quantity, price, side, exec_id, order_id, session, timestamp
+            )
+        return Trade.make(
+            symbol, quantity, price, side, exec_id, order_id, session, timestamp
+        )
+
+    def release(self, record):
+        free = self._trades if type(record) is Trade else self._orders
+        if len(free) < self.size:
+            free.append(record)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "free_orders": len(self._orders),
+            "free_trades": len(self._trades),
+        }
+
+
+class RecentIds:
+    """Set of the last ``maxlen`` retired order IDs.
+
+    Keeps duplicate order ID detection working for orders that have left the
+    book, with memory bounded by the window size instead of the number of
+    orders ever seen.
+    """
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self._ids = set()
+        self._order = deque()
+
+    def __contains__(self, order_id):
+        return order_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, order_id):
+        if order_id in self._ids:
+            return
+        self._ids.add(order_id)
+        self._order.append(order_id)
+        if len(self._order) > self.maxlen:
+            self._ids.discard(self._order.popleft())
+
+
 class Orderbook:
-    def __init__(self, symbol):
+    """Price-time priority orderbook for one symbol.
+
+    Levels are kept in a sorted dict keyed by price, or, when an
+    :class:`~pytradesim.modules.instrument.Instrument` is given, on a tick
+    ladder built from its reference price and tick size. Limit prices must
+    then be on the tick grid, they are snapped to it to remove float noise
+    and rejected when they fall between ticks.
+
+    With a :class:`RecordPool`, trades are taken from the pool and cancelled or
+    replaced orders are released back to it.
+
+    Between ``start_auction`` and ``uncross`` limit orders are only collected,
+    and ``uncross`` then executes them all at a single equilibrium price.
+
+    ``new_order`` and ``replace_order`` return the list of trades they
+    produced. With ``trade_queue`` set, trades are also put on the
+    ``trades`` queue for consumers of the older queue based API.
+
+    ``live_order_ids`` only holds orders resting in the book: IDs are retired
+    when an order fills, is cancelled or replaced. A ``duplicate_window`` keeps
+    that many retired IDs around to still reject their reuse.
+
+    With ``deltas`` set the book remembers which price levels changed, and
+    ``level_changes`` returns them relative to what it last returned.
+
+    On a tick ladder, limit prices more than ``price_band`` ticks away from
+    the reference price are rejected.
+    """
+
+    def __init__(
+        self,
+        symbol,
+        instrument=None,
+        pool=None,
+        trade_queue=False,
+        duplicate_window=0,
+        deltas=False,
+        price_band=1_000_000,
+    ):
         self.symbol = symbol
         self._id = 0
-        self.trades = queue.Queue()
-        self.bids = defaultdict(list)
-        self.asks = defaultdict(list)
+        self.trades = queue.Queue() if trade_queue else None
         self.live_order_ids = {}
+        self.recent_ids = RecentIds(duplicate_window) if duplicate_window else None
+        self.instrument = instrument
+        self.pool = pool
+        self.in_auction = False
+        self._make_trade = Trade.make if pool is None else pool.trade
+
+        if instrument is None:
+            self.bids = PriceLevels(bid=True)
+            self.asks = PriceLevels(bid=False)
+        else:
+            self.bids = TickLadder(
+                True, instrument.reference_price, instrument.ticksize, band=price_band
+            )
+            self.asks = TickLadder(
+                False, instrument.reference_price, instrument.ticksize, band=price_band
+            )
+
+        self._published = None
+        if deltas:
+            self.bids.changed = set()
+            self.asks.changed = set()
+            self._published = ({}, {})
 
     @property
     def best_bid(self):
-        if self.bids:
-            return max([k for k in self.bids if self.bids[k]], default=float("-inf"))
-        else:
-            return float("-inf")
+        return self.bids.best
 
     @property
     def best_ask(self):
-        if self.asks:
-            return min([k for k in self.asks if self.asks[k]], default=float("inf"))
-        else:
-            return float("inf")
+        return self.asks.best
 
     def bbo(self):
         return (self.best_bid, self.best_ask)
 
-    def _level_qty(self, level):
-        if level:
-            qty = 0
-            for order in level:
-                qty += order.quantity
-            return qty
-        else:
-            return 0
+    def stats(self):
+        return {
+            "live_orders": len(self.live_order_ids),
+            "recent_ids": len(self.recent_ids) if self.recent_ids is not None else 0,
+            "bid_levels": len(self.bids),
+            "ask_levels": len(self.asks),
+        }
+
+    def book(self, depth=None):
+        return self.bids.depth(depth), self.asks.depth(depth)
+
+    def level_changes(self):
+        """Level updates since the last call, as (action, side, price, size, level).
+
+        ``action`` is "new", "change" or "delete", ``side`` is "b" or "s" and
+        ``level`` is the 1-based position from the best price, for a deleted
+        level the position it would have now. Updates come per side, best
+        price first. Only available on a book created with ``deltas``.
+        """
+        changes = []
+
+        for side, levels, published in (
+            ("b", self.bids, self._published[0]),
+            ("s", self.asks, self._published[1]),
+        ):
+            for price in sorted(levels.changed, reverse=levels.bid):
+                size = levels[price].quantity
+                previous = published.get(price)
 
-    def book(self):
-        bid_prices = sorted(self.bids.keys(), reverse=True)
-        ask_prices = sorted(self.asks.keys())
-        _bid_levels = []
-        _ask_levels = []
+                if size:
+                    if previous is None:
+                        action = "new"
+                    elif previous != size:
+                        action = "change"
+                    else:
+                        continue
+                    published[price] = size
+                elif previous is not None:
+                    action = "delete"
+                    del published[price]
+                else:
+                    continue
 
-        for bid_prc in bid_prices:
-            bid_qty = self._level_qty(self.bids[bid_prc])
-            if bid_qty != 0:
-                _bid_levels.append((bid_prc, bid_qty))
+                changes.append((action, side, price, size, levels.position(price)))
 
-        for ask_prc in ask_prices:
-            ask_qty = self._level_qty(self.asks[ask_prc])
-            if ask_qty != 0:
-                _ask_levels.append((ask_prc, ask_qty))
+            levels.changed.clear()
 
-        return _bid_levels, _ask_levels
+        return changes
 
     def _show_orderbook(self):
         table = PrettyTable()
@@ -91,100 +591,377 @@ class Orderbook:
         print(f"Symbol: {self.symbol}")
         print(table)
 
-    def __checks(self, order):
+    def __rejection(self, order):
+        """Reason to refuse ``order``, checked without changing the book."""
         if order.symbol != self.symbol:
             return "[Internal] incorrect orderbook assignment"
 
-        if order.order_id not in self.live_order_ids:
-            self.live_order_ids[order.order_id] = (order.price, order.side)
-        else:
+        if self.in_auction and order.order_type == "MARKET":
+            return "[Internal] market orders not accepted during auction"
+
+        if order.order_id in self.live_order_ids or (
+            self.recent_ids is not None and order.order_id in self.recent_ids
+        ):
             return "[Internal] duplicate order ID sent"
 
+        if self.instrument is not None and order.order_type == "LIMIT":
+            if not self.bids.in_band(order.price):
+                return "[Internal] price outside the price band"
+
+            if not self.bids.on_tick(order.price):
+                return "[Internal] price not on the tick grid"
+
+    def __checks(self, order):
+        result = self.__rejection(order)
+
+        if result:
+            return result
+
+        self.live_order_ids[order.order_id] = order
+
+        if self.instrument is not None and order.order_type == "LIMIT":
+            order.price = self.bids.snap(order.price)
+
     def new_order(self, order):
         result = self.__checks(order)
 
         if result:
             return result
 
+        if self.in_auction:
+            (self.bids if order.side == "b" else self.asks).add(order)
+            return []
+
         # timestamp = order.timestamp
         side = order.side
         order_type = order.order_type
         best_bid, best_ask = self.best_bid, self.best_ask
+        fills = []
 
         # Market
         if order_type == "MARKET":
             order.price = float("-inf") if side == "s" else float("inf")
-            self.__process_execution(order)
-            return
+            self.__process_execution(order, fills)
+            self.__retire(order)
 
         # Limit
-        if order_type == "LIMIT":
+        elif order_type == "LIMIT":
             if side == "b":
                 if order.price >= best_ask and self.asks:
-                    self.__process_execution(order)
+                    self.__process_execution(order, fills)
                     if order.quantity > 0:
-                        self.bids[order.price].append(order)
+                        self.bids.add(order)
+                    else:
+                        self.__retire(order)
                 else:
-                    self.bids[order.price].append(order)
+                    self.bids.add(order)
             else:
                 if order.price <= best_bid and self.bids:
-                    self.__process_execution(order)
+                    self.__process_execution(order, fills)
                     if order.quantity > 0:
-                        self.asks[order.price].append(order)
+                        self.asks.add(order)
+                    else:
+                        self.__retire(order)
                 else:
-                    self.asks[order.price].append(order)
+                    self.asks.add(order)
+
+        if fills and self.trades is not None:
+            for trade in fills:
+                self.trades.put(trade)
+
+        return fills
+
+    def submit_many(self, orders):
+        """Enter a sequence of orders in one call.
+
+        Gives the same book and trades as calling ``new_order`` for each order
+        in turn, but keeps the best prices in locals between orders and only
+        enters the matcher when an order crosses. Returns ``(fills, rejects)``
+        where ``rejects`` holds ``(order_id, reason)`` for refused orders.
+        """
+        fills = []
+        rejects = []
+        bids, asks = self.bids, self.asks
+        checks = self.__checks
+        process_execution = self.__process_execution
+        retire = self.__retire
+        best_bid, best_ask = bids.best, asks.best
+
+        for order in orders:
+            result = checks(order)
+
+            if result:
+                rejects.append((order.order_id, result))
+                continue
+
+            if self.in_auction:
+                (bids if order.side == "b" else asks).add(order)
+            elif order.order_type == "MARKET":
+                order.price = float("-inf") if order.side == "s" else float("inf")
+                process_execution(order, fills)
+                retire(order)
+                best_bid, best_ask = bids.best, asks.best
+            elif order.side == "b":
+                if order.price >= best_ask:
+                    process_execution(order, fills)
+                    if order.quantity > 0:
+                        bids.add(order)
+                    else:
+                        retire(order)
+                    best_bid, best_ask = bids.best, asks.best
+                else:
+                    bids.add(order)
+                    if order.price > best_bid:
+                        best_bid = order.price
+            else:
+                if order.price <= best_bid:
+                    process_execution(order, fills)
+                    if order.quantity > 0:
+                        asks.add(order)
+                    else:
+                        retire(order)
+                    best_bid, best_ask = bids.best, asks.best
+                else:
+                    asks.add(order)
+                    if order.price < best_ask:
+                        best_ask = order.price
+
+        if fills and self.trades is not None:
+            for trade in fills:
+                self.trades.put(trade)
+
+        return fills, rejects
+
+    def cancel_many(self, order_ids):
+        """Delete a sequence of orders, return ``(order_id, reason)`` rejects."""
+        rejects = []
+        live_order_ids = self.live_order_ids
+
+        for order_id in order_ids:
+            resting_order = live_order_ids.get(order_id)
+
+            if resting_order is None:
+                rejects.append((order_id, "[Internal] orignal order ID not found"))
+                continue
+
+            levels = self.asks if resting_order.side == "s" else self.bids
+
+            if levels.remove(resting_order):
+                self.__retire(resting_order)
+
+        return rejects
 
     def replace_order(self, orig_order_id, order):
-        levels = self.asks if order.side == "s" else self.bids
-        price = self.live_order_ids[orig_order_id][0]
+        if orig_order_id not in self.live_order_ids:
+            return "[Internal] orignal order ID not found"
 
-        for resting_order in levels[price]:
-            if resting_order.order_id == orig_order_id:
-                levels[price].remove(resting_order)
-                self.new_order(order)
-                break
+        # refuse the replacement before the original leaves the book
+        result = self.__rejection(order)
+
+        if result:
+            return result
+
+        resting_order = self.live_order_ids[orig_order_id]
+        levels = self.asks if resting_order.side == "s" else self.bids
+
+        if levels.remove(resting_order):
+            self.__retire(resting_order)
+            return self.new_order(order)
+
+        return []
 
     def delete_order(self, orig_order_id):
         if orig_order_id not in self.live_order_ids:
             return "[Internal] orignal order ID not found"
 
-        price, side = self.live_order_ids[orig_order_id]
-        levels = self.asks if side == "s" else self.bids
+        resting_order = self.live_order_ids[orig_order_id]
+        levels = self.asks if resting_order.side == "s" else self.bids
+
+        if levels.remove(resting_order):
+            self.__retire(resting_order)
+
+    def start_auction(self):
+        """Collect limit orders without matching until ``uncross``."""
+        self.in_auction = True
 
-        for resting_order in levels[price]:
-            if resting_order.order_id == orig_order_id:
-                levels[price].remove(resting_order)
-                self.live_order_ids.pop(orig_order_id)
+    def equilibrium(self):
+        """Auction price and executable volume of the collected orders.
+
+        Cumulative demand and supply are evaluated at every price level with
+        NumPy. The price maximising the executable volume wins, ties go to the
+        smallest imbalance, then to the price closest to the instrument's
+        reference price or, without an instrument, the middle candidate.
+        Returns ``(None, 0)`` when nothing can trade.
+        """
+        import numpy as np
+
+        bid_levels = self.bids.depth()[::-1]
+        ask_levels = self.asks.depth()
+
+        if not bid_levels or not ask_levels:
+            return None, 0
+
+        # quantities keep their own type, int64 for integer sizes, so the
+        # volume and the fills cut from it do not turn into floats
+        bid_prices, bid_qty = (np.array(column) for column in zip(*bid_levels))
+        ask_prices, ask_qty = (np.array(column) for column in zip(*ask_levels))
+        prices = np.union1d(bid_prices, ask_prices)
+
+        # demand at p: bids priced at or above p, supply: asks at or below p
+        demand = np.append(np.cumsum(bid_qty[::-1])[::-1], 0)[
+            np.searchsorted(bid_prices, prices, side="left")
+        ]
+        supply = np.insert(np.cumsum(ask_qty), 0, 0)[
+            np.searchsorted(ask_prices, prices, side="right")
+        ]
+        volume = np.minimum(demand, supply)
+        best_volume = volume.max()
+
+        if best_volume <= 0:
+            return None, 0
+
+        candidates = np.flatnonzero(volume == best_volume)
+        imbalance = np.abs(demand - supply)[candidates]
+        candidates = candidates[imbalance == imbalance.min()]
+
+        if self.instrument is not None:
+            distance = np.abs(prices[candidates] - self.instrument.reference_price)
+            index = candidates[np.argmin(distance)]
+        else:
+            index = candidates[len(candidates) // 2]
+
+        return prices[index].item(), best_volume.item()
+
+    def uncross(self):
+        """Execute the collected orders at the equilibrium price.
+
+        Bids priced at or above the auction price and asks at or below it are
+        filled in price then time priority, up to the executable volume, and
+        continuous matching resumes. Returns the list of trades.
+        """
+        import numpy as np
+
+        self.in_auction = False
+        price, volume = self.equilibrium()
+        fills = []
+
+        if price is None:
+            return fills
+
+        buys = self.__auction_orders(self.bids, price, volume)
+        sells = self.__auction_orders(self.asks, price, volume)
+
+        # split the volume at every order boundary on either side, each
+        # segment is one buyer trading with one seller
+        buy_ends = np.cumsum([order.quantity for _, order in buys])
+        sell_ends = np.cumsum([order.quantity for _, order in sells])
+        ends = np.union1d(buy_ends[buy_ends < volume], sell_ends[sell_ends < volume])
+        ends = np.append(ends, volume)
+        starts = np.insert(ends[:-1], 0, 0)
+        buyers = np.searchsorted(buy_ends, starts, side="right").tolist()
+        sellers = np.searchsorted(sell_ends, starts, side="right").tolist()
+        sizes = (ends - starts).tolist()
+
+        timestamp = time.time() * 1e6
+        make_trade = self._make_trade
+
+        for buyer, seller, size in zip(buyers, sellers, sizes):
+            buy_order = buys[buyer][1]
+            sell_order = sells[seller][1]
+            exec_id = self.execution_id()
+
+            for order in (buy_order, sell_order):
+                fills.append(
+                    make_trade(
+                        order.symbol,
+                        size,
+                        price,
+                        order.side,
+                        exec_id,
+                        order.order_id,
+                        order.session,
+                        timestamp,
+                    )
+                )
+
+        self.__auction_fill(self.bids, buys, buy_ends, volume)
+        self.__auction_fill(self.asks, sells, sell_ends, volume)
+
+        if fills and self.trades is not None:
+            for trade in fills:
+                self.trades.put(trade)
+
+        return fills
+
+    def __auction_orders(self, levels, price, volume):
+        """(level price, order) pairs in priority until ``volume`` is covered."""
+        orders = []
+        total = 0
+
+        for level_price in levels.sorted_prices():
+            if (levels.bid and level_price < price) or (
+                not levels.bid and level_price > price
+            ):
                 break
 
+            for order in levels[level_price]:
+                orders.append((level_price, order))
+                total += order.quantity
+                if total >= volume:
+                    return orders
+
+        return orders
+
+    def __auction_fill(self, levels, orders, ends, volume):
+        for (level_price, order), end in zip(orders, ends.tolist()):
+            size = order.quantity - max(end - volume, 0)
+            level = levels[level_price]
+            order.quantity -= size
+            level.quantity -= size
+            if levels.changed is not None:
+                levels.changed.add(level_price)
+
+            if order.quantity == 0:
+                self.__retire(level.popleft())
+                if not level:
+                    levels.discard(level_price)
+
     def __match(self, side, order_price, book_price):
         if side == "s":
             return order_price <= book_price
         else:
             return order_price >= book_price
 
-    def __process_execution(self, order):
+    def __process_execution(self, order, fills):
         levels = self.asks if order.side == "b" else self.bids
 
-        prices = sorted(levels.keys(), reverse=(order.side == "s"))
-
-        for price in prices:
-            if order.quantity > 0 and self.__match(order.side, order.price, price):
-                for resting_order in levels[price]:
-                    if order.quantity == 0:
-                        break
+        while order.quantity > 0 and levels:
+            price = levels.best
+            if not self.__match(order.side, order.price, price):
+                break
 
-                    executions = self.__execute(order, resting_order)
+            level = levels.best_level()
+            while order.quantity > 0 and level:
+                resting_order = level.head
+                executions = self.__execute(order, resting_order)
+                level.quantity -= executions[0].quantity
+                fills.extend(executions)
 
-                    for trade in executions:
-                        self.trades.put(trade)
+                if resting_order.quantity == 0:
+                    self.__retire(level.popleft())
 
-                for resting_order in list(levels[price]):
-                    if resting_order.quantity == 0:
-                        levels[price].remove(resting_order)
+            if not level:
+                levels.discard(price)
+            elif levels.changed is not None:
+                levels.changed.add(price)
 
-            if len(levels[price]) == 0:
-                levels.pop(price)
+    def __retire(self, order):
+        """Forget an order that has left the book for good."""
+        del self.live_order_ids[order.order_id]
+        if self.recent_ids is not None:
+            self.recent_ids.add(order.order_id)
+        if self.pool is not None:
+            self.pool.release(order)
 
     def execution_id(self):
         self._id = self._id + 1
@@ -198,9 +975,10 @@ class Orderbook:
         resting_order.quantity -= size
 
         exec_id = self.execution_id()
+        timestamp = time.time() * 1e6
 
         return (
-            Trade(
+            self._make_trade(
                 resting_order.symbol,
                 size,
                 resting_order.price,
@@ -208,8 +986,9 @@ class Orderbook:
                 exec_id,
                 resting_order.order_id,
                 resting_order.session,
+                timestamp,
             ),
-            Trade(
+            self._make_trade(
                 order.symbol,
                 size,
                 resting_order.price,
@@ -217,16 +996,30 @@ class Orderbook:
                 exec_id,
                 order.order_id,
                 order.session,
+                timestamp,
             ),
         )
 
 
 class MatchingEngine:
+    __slots__ = ()
+
     def timestamp(self):
         return time.time() * 1e6
 
 
 class Trade(MatchingEngine):
+    __slots__ = (
+        "symbol",
+        "price",
+        "quantity",
+        "side",
+        "exec_id",
+        "order_id",
+        "session",
+        "timestamp",
+    )
+
     def __init__(self, symbol, quantity, price, side, exec_id, order_id, session):
         self.symbol = symbol
         self.price = price
@@ -235,7 +1028,27 @@ class Trade(MatchingEngine):
         self.exec_id = exec_id
         self.order_id = order_id
         self.session = session
-        self.timestamp = self.timestamp()
+        self.timestamp = MatchingEngine.timestamp(self)
+
+    @classmethod
+    def make(cls, symbol, quantity, price, side, exec_id, order_id, session, timestamp):
+        """Build a trade for the matching engine, with the timestamp given."""
+        return cls.__new__(cls).reset(
+            symbol, quantity, price, side, exec_id, order_id, session, timestamp
+        )
+
+    def reset(
+        self, symbol, quantity, price, side, exec_id, order_id, session, timestamp
+    ):
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.exec_id = exec_id
+        self.order_id = order_id
+        self.session = session
+        self.timestamp = timestamp
+        return self
 
     def __repr__(self):
         return (
@@ -247,6 +1060,19 @@ class Trade(MatchingEngine):
 
 
 class Order(MatchingEngine):
+    __slots__ = (
+        "symbol",
+        "session",
+        "price",
+        "quantity",
+        "_side",
+        "_order_type",
+        "order_id",
+        "timestamp",
+        "_prev",
+        "_next",
+    )
+
     def __init__(self, symbol, price, quantity, side, order_type, order_id, session):
         self.symbol = symbol
         self.session = session
@@ -255,7 +1081,38 @@ class Order(MatchingEngine):
         self.side = side
         self.order_type = order_type
         self.order_id = order_id
-        self.timestamp = self.timestamp()
+        self.timestamp = MatchingEngine.timestamp(self)
+        self._prev = None
+        self._next = None
+
+    @classmethod
+    def make(
+        cls, symbol, price, quantity, side, order_type, order_id, session, timestamp
+    ):
+        """Build an order from fields that are already valid.
+
+        Skips the side and order type checks, so ``side`` must be "b" or "s"
+        and ``order_type`` must be "MARKET" or "LIMIT". Only for the engine's
+        own paths; external input goes through the constructor.
+        """
+        return cls.__new__(cls).reset(
+            symbol, price, quantity, side, order_type, order_id, session, timestamp
+        )
+
+    def reset(
+        self, symbol, price, quantity, side, order_type, order_id, session, timestamp
+    ):
+        self.symbol = symbol
+        self.session = session
+        self.price = price
+        self.quantity = quantity
+        self._side = side
+        self._order_type = order_type
+        self.order_id = order_id
+        self.timestamp = timestamp
+        self._prev = None
+        self._next = None
+        return self
 
     @property
     def side(self):
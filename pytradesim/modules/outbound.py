@@ -0,0 +1,85 @@
+import queue
+import threading
+
+
+class OutboundSender:
+    """Sends responses from a thread of its own.
+
+    The FIX callback thread only puts its responses on a bounded queue and
+    goes back to matching. The sender takes up to ``batch`` response lists
+    at a time and sends them grouped by session, keeping the order of the
+    messages within each session. When the queue is full the callback
+    thread waits, so a stuck session slows the gateway down instead of
+    growing the queue without limit.
+    """
+
+    def __init__(self, send, logger, maxsize=10000, batch=64):
+        self.send = send
+        self.logger = logger
+        self.batch = batch
+        self.responses = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._run, name="sender", daemon=True)
+        self.sent = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    def put(self, responses):
+        self.responses.put(responses)
+
+    def depth(self):
+        return self.responses.qsize()
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "batches": self.batches,
+        }
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.responses.put(None)
+        self.thread.join()
+
+    def _drain(self):
+        batch = [self.responses.get()]
+
+        depth = self.responses.qsize() + 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+        while batch[-1] is not None and len(batch) < self.batch:
+            try:
+                batch.append(self.responses.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        running = True
+
+        while running:
+            sessions = {}
+
+            for responses in self._drain():
+                if responses is None:
+                    running = False
+                    break
+                for session, message in responses:
+                    sessions.setdefault(session.toString(), []).append(
+                        (session, message)
+                    )
+
+            for messages in sessions.values():
+                for session, message in messages:
+                    try:
+                        self.send(message, session)
+                    except Exception:
+                        self.logger.exception(f"Failed to send message to {session}.")
+                    self.sent += 1
+
+            self.batches += 1
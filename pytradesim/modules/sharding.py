@@ -0,0 +1,53 @@
+import queue
+import threading
+import zlib
+
+
+class MatchingShards:
+    """Worker threads that own disjoint sets of symbols.
+
+    Each symbol is assigned to one shard by a stable hash, and every task for
+    that symbol is run in order by the shard's worker. A busy symbol then only
+    delays the symbols sharing its shard, and one book is never touched by two
+    threads at once.
+    """
+
+    def __init__(self, workers, handler, logger):
+        self.handler = handler
+        self.logger = logger
+        self.queues = [queue.Queue() for _ in range(workers)]
+        self.threads = [
+            threading.Thread(
+                target=self._run, args=(tasks,), name=f"shard-{i}", daemon=True
+            )
+            for i, tasks in enumerate(self.queues)
+        ]
+
+    def shard(self, symbol):
+        return zlib.crc32(symbol.encode()) % len(self.queues)
+
+    def submit(self, symbol, *task):
+        self.queues[self.shard(symbol)].put(task)
+
+    def depths(self):
+        return [tasks.qsize() for tasks in self.queues]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        for tasks in self.queues:
+            tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self, tasks):
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            try:
+                self.handler(*task)
+            except Exception:
+                self.logger.exception("Shard failed to process message.")
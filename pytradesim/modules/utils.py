@@ -1,14 +1,27 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import quickfix as fix
 
 from datetime import datetime
 
 
 class LogFormat(logging.Formatter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._second = (None, None)
+
     def formatTime(self, record, datefmt=None):
-        log_time = datetime.fromtimestamp(record.created)
-        microseconds = "{0:.6f}".format(record.created).rsplit(".")[1]
-        formatted_logline = f"{log_time.strftime('%Y-%m-%d %H:%M:%S')}.{microseconds}"
+        # records mostly arrive within the same second, only the fraction changes
+        second, microseconds = "{0:.6f}".format(record.created).split(".")
+        cached_second, second_text = self._second
+        if second != cached_second:
+            second_text = datetime.fromtimestamp(int(second)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+            self._second = (second, second_text)
+        formatted_logline = f"{second_text}.{microseconds}"
 
         return formatted_logline
 
@@ -19,24 +32,212 @@ class LogFormat(logging.Formatter):
         return indent.join([line for line in msg.split("\n")])
 
 
-def setup_logging(log_path, file_name):
+class BatchedFlush:
+    """Handler mixin that flushes the stream every ``batch`` records.
+
+    Records are written as they come but the stream is only flushed once the
+    batch is full or when ``flush()`` is called, which the log listener does
+    whenever its queue runs dry.
+    """
+
+    def __init__(self, *args, batch=256, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch = batch
+        self._pending = 0
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+            self.stream.write(msg + self.terminator)
+            self._pending += 1
+            if self._pending >= self.batch:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self._pending = 0
+        super().flush()
+
+
+class BatchedStreamHandler(BatchedFlush, logging.StreamHandler):
+    pass
+
+
+class BatchedFileHandler(BatchedFlush, logging.FileHandler):
+    pass
+
+
+class LogListener(logging.handlers.QueueListener):
+    """Writes queued records on a background thread.
+
+    Handlers are flushed each time the queue is drained, so a burst is
+    written out in one go and nothing sits in a buffer while idle.
+    """
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+
+        for handler in self.handlers:
+            handler.flush()
+        return self.queue.get()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+def setup_logging(log_path, file_name, queued=False):
+    """Logs to a file and the console from the root logger.
+
+    With ``queued`` the calling thread only puts records on a queue and a
+    background listener formats and writes them, so disk or console stalls
+    do not hold up the caller.
+    """
     log_formatter = LogFormat(
         fmt="%(asctime)s [%(levelname)-7.7s] (%(funcName)-9.9s) %(message)s"
     )
     root_logger = logging.getLogger()
 
-    file_handler = logging.FileHandler("{0}/{1}.log".format(log_path, file_name))
-    file_handler.setFormatter(log_formatter)
-    root_logger.addHandler(file_handler)
+    if queued:
+        file_handler = BatchedFileHandler("{0}/{1}.log".format(log_path, file_name))
+        console_handler = BatchedStreamHandler()
+    else:
+        file_handler = logging.FileHandler("{0}/{1}.log".format(log_path, file_name))
+        console_handler = logging.StreamHandler()
 
-    console_handler = logging.StreamHandler()
+    file_handler.setFormatter(log_formatter)
     console_handler.setFormatter(log_formatter)
-    root_logger.addHandler(console_handler)
+
+    if queued:
+        records = queue.SimpleQueue()
+        listener = LogListener(
+            records, file_handler, console_handler, respect_handler_level=True
+        )
+        queue_handler = logging.handlers.QueueHandler(records)
+        queue_handler.listener = listener
+        root_logger.addHandler(queue_handler)
+        listener.start()
+        atexit.register(listener.stop)
+    else:
+        root_logger.addHandler(file_handler)
+        root_logger.addHandler(console_handler)
 
     return root_logger
 
 
+class FieldExtractor:
+    """Reads a fixed set of tags from a FIX message in one pass.
+
+    The raw message is split once and the values of the requested tags are
+    returned as strings, in the order the tags were given. Missing tags are
+    None, unless they are ``required``, which raises ``fix.FieldNotFound``
+    like ``Message.getField`` does. Repeating groups are not supported.
+    """
+
+    def __init__(self, *tags, required=()):
+        self.tags = tags
+        self.required = required
+        self._positions = {str(tag): position for position, tag in enumerate(tags)}
+        self._required = [(tag, tags.index(tag)) for tag in required]
+
+    def __call__(self, message):
+        values = [None] * len(self.tags)
+        positions = self._positions
+
+        for field in message.toString().split("\x01"):
+            tag, _, value = field.partition("=")
+            position = positions.get(tag)
+            if position is not None:
+                values[position] = value
+
+        for tag, position in self._required:
+            if values[position] is None:
+                raise fix.FieldNotFound(tag)
+
+        return values
+
+
 class Message(fix.Message):
     def __str__(self):
         message = super().__str__()
         return message.replace("\x01", "|")
+
+
+def format_value(value):
+    """Renders a field value the way quickfix renders its typed fields.
+
+    Floats get up to 15 significant digits and at most 15 decimals, always
+    in fixed-point notation as FIX has no exponents.
+    """
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        text = f"{value:.15g}"
+        if "e" in text:
+            text = f"{value:.15f}".rstrip("0").rstrip(".")
+            if text == "-0":
+                text = "0"
+        return text
+    return str(value)
+
+
+class ExecutionReports:
+    """Builds execution reports from cached per-session, per-symbol templates.
+
+    The fields that never change for a session and symbol (begin string,
+    message type, symbol and transaction type) are set once.
+    Every report then only patches the given ``(tag, value)`` pairs onto a
+    copy of its template. With ``raw=True`` the template is a tag=value
+    prefix and the report is parsed from a single string, which avoids the
+    per-field calls into quickfix altogether.
+    """
+
+    def __init__(self, raw=False):
+        self.raw = raw
+        self.templates = {}
+
+    def __len__(self):
+        return len(self.templates)
+
+    def build(self, sessionID, symbol, fields):
+        key = (sessionID.toString(), symbol)
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = self._template(sessionID, symbol)
+
+        if self.raw:
+            body = "".join(f"{tag}={format_value(value)}\x01" for tag, value in fields)
+            return Message(template + body, False)
+
+        report = Message(template)
+        for tag, value in fields:
+            report.setField(tag, format_value(value))
+        return report
+
+    def _template(self, sessionID, symbol):
+        begin_string = sessionID.getBeginString().getValue()
+
+        if self.raw:
+            return (
+                f"{fix.BeginString().getTag()}={begin_string}\x01"
+                f"{fix.MsgType().getTag()}={fix.MsgType_ExecutionReport}\x01"
+                f"{fix.Symbol().getTag()}={symbol}\x01"
+                f"{fix.ExecTransType().getTag()}={fix.ExecTransType_NEW}\x01"
+            )
+
+        template = Message()
+        template.getHeader().setField(fix.BeginString(begin_string))
+        template.getHeader().setField(fix.MsgType(fix.MsgType_ExecutionReport))
+        template.setField(fix.Symbol(symbol))
+        template.setField(fix.ExecTransType(fix.ExecTransType_NEW))
+        return template
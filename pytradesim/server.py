@@ -2,12 +2,14 @@
 
 import logging
 from multiprocessing.connection import Client
-from time import sleep
+from time import perf_counter, sleep
 
 import click
 import quickfix as fix
-from modules.broker import FLUSH_BOOK, MARKETS, MessageBroker
-from modules.market.utils import Book
+from modules.broker import STATE, MessageBroker
+from modules.market import codec
+from modules.market.utils import Book, BookUpdate
+from modules.orderbook import RecordPool
 from modules.utils import setup_logging
 
 
@@ -16,6 +18,93 @@ from modules.utils import setup_logging
     options_metavar="[options...]",
 )
 @click.option("--port", "-p", default=9000, show_default=True, help="Listening port.")
+@click.option(
+    "--depth",
+    default=0,
+    show_default=True,
+    help="No.of price levels published per side, 0 for the full book. "
+    "Snapshots are always full depth with --incremental.",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Publish level changes with sequence numbers after an initial snapshot, "
+    "instead of a snapshot on every change.",
+)
+@click.option(
+    "--conflation",
+    default=0.0,
+    show_default=True,
+    help="Seconds to wait after publishing so further book changes are merged "
+    "into the next snapshot, 0 publishes on every change.",
+)
+@click.option(
+    "--pool-size",
+    default=0,
+    show_default=True,
+    help="Free list size for recycled order and trade records, 0 to disable.",
+)
+@click.option(
+    "--duplicate-window",
+    default=0,
+    show_default=True,
+    help="No.of filled or cancelled order IDs kept per book to reject reuse.",
+)
+@click.option(
+    "--shards",
+    default=0,
+    show_default=True,
+    help="No.of matching worker threads, symbols are spread across them. "
+    "0 matches inline on the FIX callback thread.",
+)
+@click.option(
+    "--outbound-queue",
+    default=0,
+    show_default=True,
+    help="Size of the queue feeding a dedicated sender thread, 0 sends inline "
+    "on the FIX callback thread.",
+)
+@click.option(
+    "--raw-reports",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Encode execution reports as raw tag=value strings.",
+)
+@click.option(
+    "--ring",
+    default="",
+    help="Publish books into a shared memory ring buffer of this name instead "
+    "of sending them to the market data server on --port.",
+)
+@click.option(
+    "--ring-slots",
+    default=1024,
+    show_default=True,
+    help="No.of messages kept in the ring buffer.",
+)
+@click.option(
+    "--ring-slot-size",
+    default=16384,
+    show_default=True,
+    help="Bytes per ring buffer message, must fit a full book snapshot.",
+)
+@click.option(
+    "--snapshot-interval",
+    default=5.0,
+    show_default=True,
+    help="Seconds between snapshots of every book in the ring buffer with "
+    "--incremental, so readers that missed updates can recover.",
+)
+@click.option(
+    "--threaded",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Run each FIX session on its own thread.",
+)
 @click.option(
     "-d",
     "--debug",
@@ -24,7 +113,23 @@ from modules.utils import setup_logging
     show_default=True,
     help="Print debug messages.",
 )
-def main(port=9000, debug=None):
+def main(
+    port=9000,
+    depth=0,
+    incremental=False,
+    conflation=0.0,
+    pool_size=0,
+    duplicate_window=0,
+    shards=0,
+    outbound_queue=0,
+    raw_reports=False,
+    ring="",
+    ring_slots=1024,
+    ring_slot_size=16384,
+    snapshot_interval=5.0,
+    threaded=False,
+    debug=None,
+):
     """FIX gateway
 
     Accepts orders over a FIX session.
@@ -45,39 +150,137 @@ def main(port=9000, debug=None):
 
     app.set_logging(logger)
 
-    acceptor = fix.SocketAcceptor(app, store, settings, log)
+    if pool_size:
+        app.set_pool(RecordPool(pool_size))
+
+    app.set_duplicate_window(duplicate_window)
+    app.set_raw_reports(raw_reports)
+    app.set_deltas(incremental)
+
+    if outbound_queue:
+        app.set_sender(outbound_queue)
+        logger.info(f"Sending from a dedicated thread, queue size {outbound_queue}.")
+
+    if shards:
+        app.set_shards(shards)
+        logger.info(f"Matching on {shards} shard workers.")
+
+    if threaded:
+        acceptor = fix.ThreadedSocketAcceptor(app, store, settings, log)
+    else:
+        acceptor = fix.SocketAcceptor(app, store, settings, log)
+
+    ring_buffer = None
 
     try:
         acceptor.start()
         logger.info("FIX.4.2 server started.")
 
-        conn = Client(address, authkey=b"Dj$0.Jkx1@")
+        if ring:
+            from modules.market.ring import RingBuffer
+
+            conn = None
+            ring_buffer = RingBuffer.create(ring, ring_slots, ring_slot_size)
+            publish = ring_buffer.publish
+            logger.info(f"Started market data publisher on ring buffer {ring}.")
+        else:
+            conn = Client(address, authkey=b"Dj$0.Jkx1@")
+            publish = conn.send_bytes
+            logger.info(f"Started market data publisher at port {port}.")
 
-        logger.info(f"Started market data publisher at port {port}.")
+        published = 0
+        max_latency = 0.0
+        last_stats = last_snapshots = perf_counter()
+        # last sequence number sent per symbol, and symbols the market data
+        # server asked a snapshot for after missing an update
+        sequences = {}
+        snapshots = set()
 
         while True:
-            sleep(1)
-            if MARKETS:
-                for market in MARKETS:
-                    # remove the comment below to print debug orderbook
-                    # logger.debug(f"\n{MARKETS[market]._show_orderbook()}")
-                    if market in FLUSH_BOOK:
-                        bids, asks = MARKETS[market].book()
-                        trades = []
-                        if FLUSH_BOOK[market]:
-                            # trades
-                            trades = list(set(FLUSH_BOOK[market]))
+            changed = STATE.changed_books(timeout=1)
+            while incremental and conn is not None and conn.poll():
+                snapshots.add(conn.recv_bytes().decode())
+
+            if (
+                incremental
+                and conn is None
+                and perf_counter() - last_snapshots >= snapshot_interval
+            ):
+                # ring readers cannot ask for a snapshot
+                snapshots.update(sequences)
+                last_snapshots = perf_counter()
+
+            for market in changed.keys() | snapshots:
+                # remove the comment below to print debug orderbook
+                # logger.debug(f"\n{STATE.markets[market]._show_orderbook()}")
+                with STATE.lock(market):
+                    if market not in STATE.markets or (
+                        market not in STATE.flush_book and market not in snapshots
+                    ):
+                        continue
+                    orderbook = STATE.markets[market]
+                    # trades
+                    trades = STATE.flush_book.pop(market, [])
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"{market} book stats {orderbook.stats()}")
+
+                    if not incremental:
+                        bids, asks = orderbook.book(depth or None)
                         book = Book(market, bids, asks, trades)
-                        conn.send(book)
-                        FLUSH_BOOK.pop(market)
+                    elif market in snapshots or market not in sequences:
+                        bids, asks = orderbook.book(None)
+                        # the snapshot covers every change made so far
+                        orderbook.level_changes()
+                        sequences[market] = sequences.get(market, 0) + 1
+                        book = Book(market, bids, asks, trades, sequences[market])
+                    else:
+                        sequences[market] += 1
+                        book = BookUpdate(
+                            market, orderbook.level_changes(), trades, sequences[market]
+                        )
+                try:
+                    publish(codec.encode(book))
+                except ValueError as error:
+                    logger.error(f"Failed to publish {market} book: {error}")
+                    continue
+
+                if market in changed:
+                    latency = perf_counter() - changed[market]
+                    max_latency = max(max_latency, latency)
+                published += 1
+
+            snapshots.clear()
+
+            if perf_counter() - last_stats >= 1:
+                logger.debug(
+                    f"Published {published} books, "
+                    f"max latency {max_latency * 1e6:.0f} us after the change"
+                )
+                if app.sender is not None:
+                    logger.debug(f"Outbound sender stats {app.sender.stats()}")
+                published = 0
+                max_latency = 0.0
+                last_stats = perf_counter()
+
+            if conflation:
+                sleep(conflation)
 
     except (fix.ConfigError, fix.RuntimeError) as error:
         raise fix.RuntimeError(error)
     except KeyboardInterrupt:
         logger.info(f"Got signal interrupt, exiting...")
+        if app.pool is not None:
+            logger.info(f"Record pool stats {app.pool.stats()}")
         acceptor.stop()
+        if app.shards is not None:
+            app.shards.stop()
+        if app.sender is not None:
+            app.sender.stop()
+            logger.info(f"Outbound sender stats {app.sender.stats()}")
+        if ring_buffer is not None:
+            ring_buffer.close()
 
 
 if __name__ == "__main__":
-    logger = setup_logging("logs/", "server")
+    logger = setup_logging("logs/", "server", queued=True)
     main()
@@ -0,0 +1,105 @@
+"""Cost of sending books from the exchange to the market data server.
+
+Encodes and decodes full book snapshots and level updates with pickle, as
+Connection.send and recv do, and with the binary codec. Prints the time per
+book for each direction and the payload size.
+
+    python tests/benchmark_codec.py -s 20000 -l 100
+"""
+
+import pickle
+import random
+from time import perf_counter
+
+import click
+
+from pytradesim.modules.market import codec
+from pytradesim.modules.market.utils import Book, BookUpdate
+
+
+def make_books(size, levels):
+    books = []
+
+    for sequence in range(size):
+        mid = round(random.uniform(90, 110), 2)
+        bids = [
+            (round(mid - 0.01 * (i + 1), 2), float(random.randint(1, 1000)))
+            for i in range(levels)
+        ]
+        asks = [
+            (round(mid + 0.01 * (i + 1), 2), float(random.randint(1, 1000)))
+            for i in range(levels)
+        ]
+        trades = [(mid, float(random.randint(1, 100)))]
+        books.append(Book("HYG", bids, asks, trades, sequence))
+
+    return books
+
+
+def make_updates(size, changes):
+    return [
+        BookUpdate(
+            "HYG",
+            [
+                (
+                    random.choice(codec.ACTIONS),
+                    random.choice(codec.SIDES),
+                    round(random.uniform(90, 110), 2),
+                    float(random.randint(1, 1000)),
+                    random.randint(1, 100),
+                )
+                for _ in range(changes)
+            ],
+            [],
+            sequence,
+        )
+        for sequence in range(size)
+    ]
+
+
+def measure(name, books, encode, decode):
+    start = perf_counter()
+    payloads = [encode(book) for book in books]
+    encoded = perf_counter() - start
+
+    start = perf_counter()
+    for payload in payloads:
+        decode(payload)
+    decoded = perf_counter() - start
+
+    size = sum(len(payload) for payload in payloads) / len(payloads)
+    print(
+        f"{name:<8} encode {encoded / len(books) * 1e6:8.2f} µs  "
+        f"decode {decoded / len(books) * 1e6:8.2f} µs  "
+        f"size {size:8.0f} bytes"
+    )
+
+
+def compare(title, books):
+    click.secho(f"{title}:-", fg="green")
+    measure("pickle", books, pickle.dumps, pickle.loads)
+    measure(
+        "codec", books, codec.encode, lambda data: codec.decode(data, Book, BookUpdate)
+    )
+    print()
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "--sample-size", "-s", default=20000, show_default=True, help="No.of books."
+)
+@click.option(
+    "--levels", "-l", default=100, show_default=True, help="Price levels per side."
+)
+@click.option(
+    "--changes", "-c", default=3, show_default=True, help="Level changes per update."
+)
+@click.option("--seed", default=1, show_default=True, help="Random seed.")
+def main(sample_size, levels, changes, seed):
+    random.seed(seed)
+    compare(f"Snapshots, {levels} levels a side", make_books(sample_size, levels))
+    compare(f"Updates, {changes} changes", make_updates(sample_size, changes))
+
+
+if __name__ == "__main__":
+    main()
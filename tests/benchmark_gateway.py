@@ -0,0 +1,206 @@
+"""Latency of the FIX gateway without sockets.
+
+Builds new, replace and cancel requests with the order client's message
+builders and feeds them to MessageBroker.fromApp, with sending stubbed out.
+Only the broker call is timed: decoding, matching, report building and
+logging. Prints latency percentiles per message type and the throughput.
+
+    python tests/benchmark_gateway.py -s 20000
+"""
+
+import logging
+import random
+from statistics import mean, quantiles
+from time import perf_counter
+
+import click
+import quickfix as fix
+from pytradesim.modules.broker import ExchangeState, MessageBroker
+from pytradesim.modules.client import ORDERS, delete_order, new_order, replace_order
+from pytradesim.modules.orderbook import RecordPool
+
+MESSAGE_TYPES = {
+    fix.MsgType_NewOrderSingle: "New order (D)",
+    fix.MsgType_OrderCancelReplaceRequest: "Replace (G)",
+    fix.MsgType_OrderCancelRequest: "Cancel (F)",
+}
+
+
+class LiveOrders:
+    """Client order IDs that may still be live, picked at random.
+
+    Fills remove orders behind our back, so a picked ID is checked against
+    the broker's registry and dropped if it is gone.
+    """
+
+    def __init__(self, registry, session):
+        self.registry = registry
+        self.session = session
+        self.ids = []
+
+    def add(self, client_order_id):
+        self.ids.append(client_order_id)
+
+    def pick(self):
+        while self.ids:
+            i = random.randrange(len(self.ids))
+            client_order_id = self.ids[i]
+            self.ids[i] = self.ids[-1]
+            self.ids.pop()
+            if self.registry.get(self.session, client_order_id) is not None:
+                return client_order_id
+        return None
+
+
+def remember(message):
+    client_order_id = fix.ClOrdID()
+    symbol = fix.Symbol()
+    price = fix.Price()
+    quantity = fix.OrderQty()
+    side = fix.Side()
+    for field in (client_order_id, symbol, price, quantity, side):
+        message.getField(field)
+
+    ORDERS[client_order_id.getValue()] = [symbol, price, quantity, side]
+    return client_order_id.getValue()
+
+
+def make_broker(pool_size, raw_reports, log_level):
+    logger = logging.getLogger("benchmark")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    logger.setLevel(log_level)
+
+    broker = MessageBroker()
+    broker.set_logging(logger)
+    broker.state = ExchangeState()
+    broker.send = lambda message, sessionID: None
+    if pool_size:
+        broker.set_pool(RecordPool(pool_size))
+    broker.set_raw_reports(raw_reports)
+
+    sessions = [fix.SessionID("FIX.4.2", "EXCHANGE", f"CLIENT{i}") for i in (1, 2)]
+    broker.onCreate(sessions[0])
+    for session in sessions:
+        broker.onLogon(session)
+
+    return broker, sessions
+
+
+def next_message(session, live, symbols, replace, cancel):
+    sender_comp_id = session.getTargetCompID().getValue()
+    action = random.random()
+
+    if action < replace + cancel:
+        orig_client_order_id = live.pick()
+        if orig_client_order_id is not None:
+            if action < replace:
+                message = replace_order(
+                    sender_comp_id,
+                    "EXCHANGE",
+                    random.randint(1, 100),
+                    round(random.uniform(99, 101), 2),
+                    orig_client_order_id,
+                )
+                live.add(remember(message))
+                return message
+            return delete_order(sender_comp_id, "EXCHANGE", orig_client_order_id)
+
+    message = new_order(
+        sender_comp_id,
+        "EXCHANGE",
+        random.choice(symbols),
+        random.randint(1, 100),
+        round(random.uniform(99, 101), 2),
+        random.choice(["buy", "sell"]),
+        "limit",
+    )
+    live.add(remember(message))
+    return message
+
+
+def run(size, symbols, replace, cancel, pool_size, raw_reports, log_level):
+    broker, sessions = make_broker(pool_size, raw_reports, log_level)
+    live = {
+        session.toString(): LiveOrders(broker.state.orders, session.toString())
+        for session in sessions
+    }
+    latencies = {msgtype: [] for msgtype in MESSAGE_TYPES}
+    msgtype = fix.MsgType()
+    total = 0.0
+
+    for _ in range(size):
+        session = random.choice(sessions)
+        message = next_message(
+            session, live[session.toString()], symbols, replace, cancel
+        )
+        message.getHeader().getField(msgtype)
+
+        start = perf_counter()
+        broker.fromApp(message, session)
+        elapsed = perf_counter() - start
+
+        latencies[msgtype.getValue()].append(elapsed)
+        total += elapsed
+
+    for key, name in MESSAGE_TYPES.items():
+        stats(name, latencies[key])
+
+    click.secho(
+        f"{size} messages in {total * 1e3:.1f} ms, "
+        f"{size / total:,.0f} messages/s through the broker",
+        fg="cyan",
+    )
+
+
+def stats(name, array):
+    if len(array) < 2:
+        return
+
+    percentiles = quantiles(array, n=100)
+    click.secho(f"{name}:-", fg="green")
+    print(f"Count - {len(array)}")
+    print(f"Mean - {mean(array) * 1e6:.3f} µs")
+    print(f"p50 - {percentiles[49] * 1e6:.3f} µs")
+    print(f"p90 - {percentiles[89] * 1e6:.3f} µs")
+    print(f"p99 - {percentiles[98] * 1e6:.3f} µs")
+    print(f"Max - {max(array) * 1e6:.3f} µs")
+    print()
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "--sample-size", "-s", default=20000, show_default=True, help="No.of messages."
+)
+@click.option(
+    "--symbols", default="HYG,MSFT,AAPL,TEST", show_default=True, help="Symbols."
+)
+@click.option("--replace", default=0.2, show_default=True, help="Replace probability.")
+@click.option("--cancel", default=0.2, show_default=True, help="Cancel probability.")
+@click.option(
+    "--pool-size", default=0, show_default=True, help="Record pool size, 0 for none."
+)
+@click.option(
+    "--raw-reports", is_flag=True, default=False, help="Raw tag=value reports."
+)
+@click.option(
+    "--log-level", default="WARNING", show_default=True, help="Broker log level."
+)
+@click.option("--seed", default=1, show_default=True, help="Random seed.")
+def main(
+    sample_size, symbols, replace, cancel, pool_size, raw_reports, log_level, seed
+):
+    random.seed(seed)
+    run(
+        sample_size,
+        symbols.split(","),
+        replace,
+        cancel,
+        pool_size,
+        raw_reports,
+        log_level.upper(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Cost of the broker's logging on the order path.
+
+Runs the same stream of crossing orders through MessageBroker.process with
+the logger at WARNING, INFO and DEBUG. Records go to a handler that formats
+them and throws them away, so the numbers include formatting but no I/O.
+
+WARNING is the baseline. At INFO the extra time should be fully explained by
+the INFO records actually emitted, so the residual after subtracting their
+cost is what the disabled debug calls add to each order.
+
+    python tests/benchmark_logging.py -s 20000
+"""
+
+import io
+import logging
+import time
+
+import click
+import quickfix as fix
+
+from pytradesim.modules.broker import ExchangeState, MessageBroker
+
+
+def new_order_single(client_order_id, side, price):
+    message = fix.Message()
+    message.getHeader().setField(fix.MsgType(fix.MsgType_NewOrderSingle))
+    message.setField(fix.ClOrdID(client_order_id))
+    message.setField(fix.Symbol("BENCH"))
+    message.setField(fix.Side(side))
+    message.setField(fix.OrdType(fix.OrdType_LIMIT))
+    message.setField(fix.Price(price))
+    message.setField(fix.OrderQty(10))
+    return message
+
+
+class CountingHandler(logging.StreamHandler):
+    def __init__(self):
+        super().__init__(io.StringIO())
+        self.records = 0
+
+    def emit(self, record):
+        self.records += 1
+        self.format(record)
+
+
+def make_logger(level):
+    logger = logging.getLogger(f"bench.{logging.getLevelName(level)}")
+    logger.propagate = False
+    handler = CountingHandler()
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger, handler
+
+
+def record_cost(records=20000):
+    logger, _ = make_logger(logging.INFO)
+    session = fix.SessionID("FIX.4.2", "EXCHANGE", "CLIENT1")
+
+    start = time.perf_counter()
+    for _ in range(records):
+        logger.info(f"Incoming new order from {session}. Processing...")
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def run(level, orders):
+    logger, handler = make_logger(level)
+
+    broker = MessageBroker()
+    broker.set_logging(logger)
+    broker.state = ExchangeState()
+    sessions = [fix.SessionID("FIX.4.2", "EXCHANGE", f"CLIENT{i}") for i in (1, 2)]
+    broker.onCreate(sessions[0])
+    for session in sessions:
+        broker.onLogon(session)
+    handler.records = 0
+
+    messages = [
+        (
+            new_order_single(f"ORDER{i}", "12"[i % 2], 100 + i % 5),
+            sessions[i % 2],
+        )
+        for i in range(orders)
+    ]
+
+    start = time.perf_counter()
+    for message, session in messages:
+        broker.process(message, session)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / orders * 1e6, handler.records / orders
+
+
+def run_levels(orders, repeat):
+    per_record = min(record_cost() for _ in range(repeat))
+    baseline = None
+
+    print(f"{'level':<8} {'us/order':>9} {'records/order':>14} {'residual':>9}")
+    for level in (logging.WARNING, logging.INFO, logging.DEBUG):
+        per_order, records = min(run(level, orders) for _ in range(repeat))
+        if baseline is None:
+            baseline = per_order
+        residual = per_order - baseline - records * per_record
+        print(
+            f"{logging.getLevelName(level):<8} {per_order:>9.2f} {records:>14.2f}"
+            f" {residual:>+9.2f}"
+        )
+    click.secho(f"One emitted record costs {per_record:.2f} µs", fg="cyan")
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "--sample-size", "-s", default=20000, show_default=True, help="No.of orders."
+)
+@click.option(
+    "--repeat", "-r", default=3, show_default=True, help="Runs per level, best kept."
+)
+def main(sample_size: int, repeat: int):
+    run_levels(sample_size, repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Throughput of the exchange to market data transports.
+
+Sends encoded book updates to reader processes through a pipe, as
+market_data.py does on --port, and through the shared memory ring buffer
+with one or more readers, as with --ring. Each reader decodes every message.
+Prints the time until all readers have every message.
+
+    python tests/benchmark_ring.py -s 50000 -r 4
+"""
+
+import multiprocessing
+import os
+from time import perf_counter, sleep
+
+import click
+
+from pytradesim.modules.market import codec
+from pytradesim.modules.market.ring import RingBuffer, RingReader
+from pytradesim.modules.market.utils import Book, BookUpdate
+
+
+def decode(data):
+    return codec.decode(data, Book, BookUpdate)
+
+
+def make_payloads(size):
+    return [
+        codec.encode(
+            BookUpdate(
+                "HYG", [("change", "b", 100.0 - i % 10 * 0.01, 10.0, 1)], [], i + 1
+            )
+        )
+        for i in range(size)
+    ]
+
+
+def pipe_reader(conn, size, done):
+    reader = codec.BookReader(conn, Book, BookUpdate)
+    for _ in range(size):
+        reader.recv()
+    done.put(0)
+
+
+def ring_reader(name, size, ready, done):
+    ring = RingBuffer.attach(name)
+    reader = RingReader(ring, start=1)
+    ready.put(None)
+
+    received = 0
+    while received + reader.lost < size:
+        if reader.read(decode) is not None:
+            received += 1
+    done.put(reader.lost)
+    ring.close()
+
+
+def run_pipe(payloads):
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    done = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=pipe_reader, args=(receiver, len(payloads), done)
+    )
+    process.start()
+
+    start = perf_counter()
+    for payload in payloads:
+        sender.send_bytes(payload)
+    done.get()
+    elapsed = perf_counter() - start
+
+    process.join()
+    return elapsed, 0
+
+
+def run_ring(payloads, readers):
+    ring = RingBuffer.create(
+        f"pytradesim_bench_{os.getpid()}", slots=len(payloads), slot_size=256
+    )
+    ready = multiprocessing.Queue()
+    done = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=ring_reader, args=(ring.memory.name, len(payloads), ready, done)
+        )
+        for _ in range(readers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+    sleep(0.1)
+
+    start = perf_counter()
+    for payload in payloads:
+        ring.publish(payload)
+    lost = sum(done.get() for _ in processes)
+    elapsed = perf_counter() - start
+
+    for process in processes:
+        process.join()
+    ring.close()
+    return elapsed, lost
+
+
+def report(name, size, elapsed, lost):
+    click.secho(f"{name}:-", fg="green")
+    print(f"{size} messages in {elapsed * 1e3:.1f} ms")
+    print(f"{elapsed / size * 1e6:.3f} µs per message")
+    print(f"Lost - {lost}")
+    print()
+
+
+@click.command(options_metavar="[options]")
+@click.option(
+    "--sample-size", "-s", default=50000, show_default=True, help="No.of messages."
+)
+@click.option(
+    "--readers", "-r", default=4, show_default=True, help="No.of ring readers."
+)
+def main(sample_size, readers):
+    payloads = make_payloads(sample_size)
+
+    report("Pipe, 1 reader", sample_size, *run_pipe(payloads))
+    report("Ring, 1 reader", sample_size, *run_ring(payloads, 1))
+    if readers > 1:
+        report(f"Ring, {readers} readers", sample_size, *run_ring(payloads, readers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+import logging
+import threading
+
+import pytest
+
+fix = pytest.importorskip("quickfix")
+
+from pytradesim.modules.broker import ExchangeState, MessageBroker  # noqa: E402
+from pytradesim.modules import utils  # noqa: E402
+from pytradesim.modules.utils import FieldExtractor  # noqa: E402
+
+
+def make_broker():
+    broker = MessageBroker()
+    broker.set_logging(logging.getLogger(__name__))
+    broker.state = ExchangeState()
+    sessions = [fix.SessionID("FIX.4.2", "EXCHANGE", f"CLIENT{i}") for i in (1, 2)]
+    broker.onCreate(sessions[0])
+    for session in sessions:
+        broker.onLogon(session)
+    return broker, sessions
+
+
+def new_order_single(client_order_id, symbol, side, quantity, price):
+    message = fix.Message()
+    message.getHeader().setField(fix.MsgType(fix.MsgType_NewOrderSingle))
+    message.setField(fix.ClOrdID(client_order_id))
+    message.setField(fix.Symbol(symbol))
+    message.setField(fix.Side(side))
+    message.setField(fix.OrdType(fix.OrdType_LIMIT))
+    message.setField(fix.Price(price))
+    message.setField(fix.OrderQty(quantity))
+    return message
+
+
+def order_replace(client_order_id, orig_client_order_id, symbol, quantity, price):
+    message = new_order_single(client_order_id, symbol, fix.Side_BUY, quantity, price)
+    message.getHeader().setField(fix.MsgType(fix.MsgType_OrderCancelReplaceRequest))
+    message.setField(fix.OrigClOrdID(orig_client_order_id))
+    return message
+
+
+def order_cancel(client_order_id, orig_client_order_id, symbol):
+    message = fix.Message()
+    message.getHeader().setField(fix.MsgType(fix.MsgType_OrderCancelRequest))
+    message.setField(fix.ClOrdID(client_order_id))
+    message.setField(fix.OrigClOrdID(orig_client_order_id))
+    message.setField(fix.Symbol(symbol))
+    message.setField(fix.Side(fix.Side_BUY))
+    return message
+
+
+def exec_type(report):
+    field = fix.ExecType()
+    report.getField(field)
+    return field.getValue()
+
+
+def report_field(report, field):
+    report.getField(field)
+    return field.getValue()
+
+
+def test_broker_new_order_and_fill():
+    broker, (client1, client2) = make_broker()
+
+    responses = broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    assert [exec_type(report) for _, report in responses] == [fix.ExecType_NEW]
+
+    responses = broker.process(
+        new_order_single("CLIENT2_1", "HYG", fix.Side_SELL, 40, 23.54), client2
+    )
+    assert [exec_type(report) for _, report in responses] == [
+        fix.ExecType_PARTIAL_FILL,
+        fix.ExecType_FILL,
+    ]
+    assert broker.state.markets["HYG"].book() == ([(23.54, 60)], [])
+    assert broker.state.flush_book["HYG"] == [(23.54, 40)]
+
+
+def test_field_extractor():
+    extract = FieldExtractor(55, 11, 44, 41)
+    message = new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54)
+
+    assert extract(message) == ["HYG", "CLIENT1_1", "23.54", None]
+
+
+def test_broker_rejects_missing_fields():
+    broker, (client1, _) = make_broker()
+
+    message = new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54)
+    message.removeField(fix.OrderQty().getTag())
+    with pytest.raises(fix.FieldNotFound):
+        broker.process(message, client1)
+
+    message = new_order_single("CLIENT1_2", "HYG", fix.Side_SELL, 100, 23.54)
+    message.removeField(fix.Price().getTag())
+    ((_, report),) = broker.process(message, client1)
+
+    assert exec_type(report) == fix.ExecType_REJECTED
+    assert "HYG" not in broker.state.markets
+    assert len(broker.state.orders) == 0
+
+
+def test_broker_ignores_unknown_message_type():
+    broker, (client1, _) = make_broker()
+    message = fix.Message()
+    message.getHeader().setField(fix.MsgType(fix.MsgType_Heartbeat))
+
+    assert broker.process(message, client1) == []
+
+
+def test_broker_order_registry():
+    broker, (client1, client2) = make_broker()
+    orders = broker.state.orders
+    session = client1.toString()
+
+    ((_, ack),) = broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    order_id = report_field(ack, fix.OrderID())
+    assert report_field(ack, fix.LeavesQty()) == 100
+    assert orders.get(session, "CLIENT1_1").order_id == order_id
+
+    ((_, replaced),) = broker.process(
+        order_replace("CLIENT1_2", "CLIENT1_1", "HYG", 80, 23.54), client1
+    )
+    assert exec_type(replaced) == fix.ExecType_REPLACED
+    assert report_field(replaced, fix.OrderID()) == order_id
+    assert orders.get(session, "CLIENT1_1") is None
+
+    responses = broker.process(
+        new_order_single("CLIENT2_1", "HYG", fix.Side_SELL, 30, 23.54), client2
+    )
+    partial = dict((s.toString(), report) for s, report in responses)[session]
+    assert exec_type(partial) == fix.ExecType_PARTIAL_FILL
+    assert report_field(partial, fix.OrderID()) == order_id
+    assert report_field(partial, fix.LeavesQty()) == 50
+    assert orders.get(client2.toString(), "CLIENT2_1") is None
+
+    ((_, cancelled),) = broker.process(
+        order_cancel("CLIENT1_3", "CLIENT1_2", "HYG"), client1
+    )
+    assert exec_type(cancelled) == fix.ExecType_CANCELED
+    assert report_field(cancelled, fix.OrderID()) == order_id
+    assert len(orders) == 0
+
+    ((_, rejected),) = broker.process(
+        order_cancel("CLIENT1_4", "CLIENT1_2", "HYG"), client1
+    )
+    assert exec_type(rejected) == fix.ExecType_REJECTED
+
+
+def test_broker_rejects_client_order_id_on_other_symbol():
+    broker, (client1, client2) = make_broker()
+    orders = broker.state.orders
+    session = client1.toString()
+
+    broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    ((_, rejected),) = broker.process(
+        new_order_single("CLIENT1_1", "MSFT", fix.Side_SELL, 10, 23.54), client1
+    )
+    assert exec_type(rejected) == fix.ExecType_REJECTED
+    assert "MSFT" not in broker.state.markets
+    assert orders.get(session, "CLIENT1_1").symbol == "HYG"
+
+    # a cancel or replace naming the wrong symbol leaves the order alone
+    broker.process(
+        new_order_single("CLIENT2_1", "MSFT", fix.Side_SELL, 10, 23.54), client2
+    )
+    for message in (
+        order_cancel("CLIENT1_2", "CLIENT1_1", "MSFT"),
+        order_replace("CLIENT1_3", "CLIENT1_1", "MSFT", 80, 23.54),
+    ):
+        ((_, rejected),) = broker.process(message, client1)
+        assert exec_type(rejected) == fix.ExecType_REJECTED
+    assert orders.get(session, "CLIENT1_2") is None
+    assert orders.get(session, "CLIENT1_3") is None
+
+    ((_, cancelled),) = broker.process(
+        order_cancel("CLIENT1_4", "CLIENT1_1", "HYG"), client1
+    )
+    assert exec_type(cancelled) == fix.ExecType_CANCELED
+    assert broker.state.markets["HYG"].book() == ([], [])
+    assert orders.get(session, "CLIENT1_1") is None
+
+
+def test_broker_unsupported_order_type_leaves_no_order():
+    broker, (client1, _) = make_broker()
+    orders = broker.state.orders
+    session = client1.toString()
+
+    message = new_order_single("A", "HYG", fix.Side_BUY, 100, 23.54)
+    message.setField(fix.OrdType(fix.OrdType_STOP))
+    with pytest.raises(ValueError):
+        broker.process(message, client1)
+    assert orders.get(session, "A") is None
+
+    ((_, ack),) = broker.process(
+        new_order_single("A", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    assert exec_type(ack) == fix.ExecType_NEW
+
+    message = order_replace("B", "A", "HYG", 80, 23.54)
+    message.setField(fix.OrdType(fix.OrdType_STOP))
+    with pytest.raises(ValueError):
+        broker.process(message, client1)
+    assert orders.get(session, "B") is None
+    assert orders.get(session, "A") is not None
+    assert broker.state.markets["HYG"].book() == ([(23.54, 100)], [])
+
+
+def test_exchange_state_signals_book_changes():
+    state = ExchangeState()
+    woken = []
+
+    def publisher():
+        woken.append(state.changed_books(timeout=5))
+
+    thread = threading.Thread(target=publisher)
+    thread.start()
+    with state.lock("HYG"):
+        state.book_changed("HYG").append((23.54, 40))
+    thread.join()
+
+    assert list(woken[0]) == ["HYG"]
+    assert state.flush_book == {"HYG": [(23.54, 40)]}
+    assert state.changed_books(timeout=0) == {}
+
+
+def test_broker_conflates_book_changes():
+    broker, (client1, client2) = make_broker()
+
+    for i in range(3):
+        broker.process(
+            new_order_single(f"CLIENT1_{i}", "HYG", fix.Side_BUY, 100, 23.54), client1
+        )
+    broker.process(
+        new_order_single("CLIENT2_1", "HYG", fix.Side_SELL, 40, 23.54), client2
+    )
+    broker.process(
+        new_order_single("CLIENT2_2", "MSFT", fix.Side_SELL, 40, 23.54), client2
+    )
+
+    changed = broker.state.changed_books(timeout=0)
+    assert sorted(changed) == ["HYG", "MSFT"]
+    assert changed["HYG"] <= changed["MSFT"]
+    assert broker.state.flush_book["HYG"] == [(23.54, 40)]
+
+
+def test_broker_publishes_each_fill_once():
+    broker, (client1, client2) = make_broker()
+
+    broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    for client_order_id in ("CLIENT2_1", "CLIENT2_2"):
+        broker.process(
+            new_order_single(client_order_id, "HYG", fix.Side_SELL, 40, 23.54),
+            client2,
+        )
+
+    # two separate fills of the same price and size are both kept
+    assert broker.state.flush_book["HYG"] == [(23.54, 40), (23.54, 40)]
+
+
+def test_broker_tracks_level_changes():
+    broker, (client1, client2) = make_broker()
+    broker.set_deltas(True)
+
+    broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    assert broker.state.markets["HYG"].level_changes() == [("new", "b", 23.54, 100, 1)]
+
+    broker.process(
+        new_order_single("CLIENT2_1", "HYG", fix.Side_SELL, 40, 23.54), client2
+    )
+    assert broker.state.markets["HYG"].level_changes() == [
+        ("change", "b", 23.54, 60, 1)
+    ]
+
+
+def test_broker_concurrent_sessions():
+    broker, (client1, client2) = make_broker()
+    symbols = ["HYG", "MSFT", "AAPL", "TEST"]
+
+    def trade(session, side, prefix):
+        for i in range(200):
+            for symbol in symbols:
+                message = new_order_single(
+                    f"{prefix}_{symbol}_{i}", symbol, side, 1, 10.0
+                )
+                broker.process(message, session)
+
+    threads = [
+        threading.Thread(target=trade, args=(client1, fix.Side_BUY, "CLIENT1")),
+        threading.Thread(target=trade, args=(client2, fix.Side_SELL, "CLIENT2")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for symbol in symbols:
+        assert broker.state.markets[symbol].book() == ([], [])
+        assert broker.state.execution_ids[symbol] == 601
+    assert len(broker.state.orders) == 0
+
+
+@pytest.mark.parametrize("raw", [False, True])
+def test_execution_report_templates(raw):
+    broker, (client1, client2) = make_broker()
+    broker.set_raw_reports(raw)
+
+    broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    responses = broker.process(
+        new_order_single("CLIENT2_1", "HYG", fix.Side_SELL, 40, 23.54), client2
+    )
+    reports = {
+        session.toString(): report.toString().split("\x01")
+        for session, report in responses
+    }
+
+    assert "55=HYG" in reports[client1.toString()]
+    assert "11=CLIENT1_1" in reports[client1.toString()]
+    assert "11=CLIENT2_1" in reports[client2.toString()]
+    assert "31=23.54" in reports[client2.toString()]
+    assert "32=40" in reports[client2.toString()]
+    assert len(broker.reports) == 2
+
+
+@pytest.mark.parametrize("raw", [False, True])
+def test_execution_report_small_prices(raw):
+    broker, (client1, client2) = make_broker()
+    broker.set_raw_reports(raw)
+
+    broker.process(
+        new_order_single("CLIENT1_1", "PENNY", fix.Side_BUY, 100, 0.00001), client1
+    )
+    responses = broker.process(
+        new_order_single("CLIENT2_1", "PENNY", fix.Side_SELL, 40, 0.00001), client2
+    )
+
+    for _, report in responses:
+        fields = report.toString().split("\x01")
+        assert "31=0.00001" in fields
+        assert "6=0.00001" in fields
+        assert not any("e-" in field for field in fields)
+
+
+def test_broker_skips_debug_formatting_at_info(monkeypatch, caplog):
+    broker, (client1, client2) = make_broker()
+
+    def fail(message):
+        raise AssertionError("execution report formatted for a disabled level")
+
+    monkeypatch.setattr(utils.Message, "__str__", fail)
+    caplog.set_level(logging.INFO, logger=__name__)
+
+    broker.process(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    broker.process(
+        new_order_single("CLIENT2_1", "HYG", fix.Side_SELL, 40, 23.54), client2
+    )
+
+    assert caplog.records
+    assert all(record.levelno >= logging.INFO for record in caplog.records)
+
+
+def test_broker_sends_from_sender_thread(monkeypatch):
+    broker, (client1, _) = make_broker()
+    sent = []
+
+    def send(message, sessionID):
+        sent.append((sessionID.toString(), threading.current_thread().name))
+
+    monkeypatch.setattr(broker, "send", send)
+    broker.set_sender(16)
+
+    broker.dispatch(
+        new_order_single("CLIENT1_1", "HYG", fix.Side_BUY, 100, 23.54), client1
+    )
+    broker.sender.stop()
+
+    assert sent == [(client1.toString(), "sender")]
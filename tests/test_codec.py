@@ -0,0 +1,58 @@
+from multiprocessing import Pipe
+
+import pytest
+
+from pytradesim.modules.market import codec
+from pytradesim.modules.market.utils import Book, BookUpdate
+
+
+def same(a, b):
+    return vars(a) == vars(b)
+
+
+def test_codec_snapshot_round_trip():
+    book = Book(
+        "HYG", [(23.54, 100.0), (23.53, 40.0)], [(23.55, 7.0)], [(23.54, 60.0)], 3
+    )
+
+    decoded = codec.decode(codec.encode(book), Book, BookUpdate)
+
+    assert isinstance(decoded, Book)
+    assert same(decoded, book)
+
+
+def test_codec_update_round_trip():
+    update = BookUpdate(
+        "HYG",
+        [("new", "b", 23.54, 100.0, 1), ("delete", "s", 23.55, 0.0, 2)],
+        [(23.55, 7.0)],
+        4,
+    )
+
+    data = codec.encode(update)
+    decoded = codec.decode(memoryview(data), Book, BookUpdate)
+
+    assert isinstance(decoded, BookUpdate)
+    assert same(decoded, update)
+    assert len(data) == codec.HEADER.size + 3 + 2 * codec.CHANGE.size + 16
+
+
+def test_codec_rejects_unknown_version():
+    data = bytearray(codec.encode(Book("HYG", [], [], [])))
+    data[0] = codec.VERSION + 1
+
+    with pytest.raises(ValueError):
+        codec.decode(data, Book, BookUpdate)
+
+
+def test_book_reader_grows_buffer():
+    reader_conn, writer_conn = Pipe(duplex=False)
+    reader = codec.BookReader(reader_conn, Book, BookUpdate, size=64)
+    levels = [(100.0 + i, 1.0) for i in range(50)]
+
+    writer_conn.send_bytes(codec.encode(Book("HYG", levels, [], [], 1)))
+    writer_conn.send_bytes(codec.encode(Book("MSFT", [(1.0, 2.0)], [], [], 2)))
+
+    assert reader.recv().bids == levels
+    assert len(reader.buffer) > 64
+    assert reader.recv().symbol == "MSFT"
@@ -0,0 +1,117 @@
+import pytest
+
+from pytradesim.modules.market import feed
+
+
+@pytest.fixture
+def loopback():
+    publisher = feed.FeedPublisher(("127.0.0.1", 0), history=4)
+    snapshots = []
+
+    def snapshot():
+        snapshots.append(publisher.sequence)
+        return publisher.sequence + 1, [b"snapshot"]
+
+    server = publisher.serve(0, snapshot)
+    receiver = feed.FeedReceiver(("127.0.0.1", 0), server.server_address)
+    publisher.address = receiver.sock.getsockname()
+
+    yield publisher, receiver, snapshots
+
+    receiver.close()
+    publisher.close()
+
+
+def lose(publisher, *messages):
+    address = publisher.address
+    publisher.address = ("127.0.0.1", 9)
+    for message in messages:
+        publisher.publish(message)
+    publisher.address = address
+
+
+def test_feed_packets():
+    packet = feed.pack(b"PYTRADESIM", 7, [b"a", b"", b"ccc"])
+    assert feed.unpack(packet) == (b"PYTRADESIM", 7, [b"a", b"", b"ccc"])
+
+
+def test_feed_keeps_recent_messages():
+    publisher = feed.FeedPublisher(("127.0.0.1", 9), history=3)
+    for message in (b"1", b"2", b"3", b"4", b"5"):
+        publisher.publish(message)
+
+    assert publisher.messages(4, 5) == (4, [b"4", b"5"])
+    assert publisher.messages(1, 4) == (3, [b"3", b"4"])
+    assert publisher.messages(6, 1) == (6, [])
+    publisher.close()
+
+
+def test_feed_in_sequence(loopback):
+    publisher, receiver, _ = loopback
+
+    for message in (b"a", b"b"):
+        publisher.publish(message)
+
+    assert receiver.recv(timeout=5) == [b"a"]
+    assert receiver.recv(timeout=5) == [b"b"]
+    assert receiver.recv(timeout=0.01) == []
+
+
+def test_feed_retransmits_gap(loopback):
+    publisher, receiver, _ = loopback
+    publisher.publish(b"a")
+    assert receiver.recv(timeout=5) == [b"a"]
+
+    lose(publisher, b"b", b"c")
+    publisher.publish(b"d")
+
+    assert receiver.recv(timeout=5) == [b"b", b"c", b"d"]
+    assert receiver.retransmitted == 2
+
+    lose(publisher, b"e")
+    publisher.heartbeat()
+
+    assert receiver.recv(timeout=5) == [b"e"]
+
+
+def test_feed_snapshot_after_long_gap(loopback):
+    publisher, receiver, snapshots = loopback
+    publisher.publish(b"a")
+    assert receiver.recv(timeout=5) == [b"a"]
+
+    lose(publisher, b"b", b"c", b"d", b"e", b"f")
+    publisher.publish(b"g")
+
+    assert receiver.recv(timeout=5) == [b"snapshot"]
+    assert snapshots == [7]
+    assert receiver.next == 8
+
+    publisher.publish(b"h")
+    assert receiver.recv(timeout=5) == [b"h"]
+
+
+def test_feed_refuses_oversized_messages(loopback):
+    publisher, receiver, _ = loopback
+
+    with pytest.raises(ValueError):
+        publisher.publish(b"x" * (feed.MAX_MESSAGE + 1))
+    assert publisher.sequence == 0
+
+    publisher.publish(b"x" * feed.MAX_MESSAGE)
+    assert receiver.recv(timeout=5) == [b"x" * feed.MAX_MESSAGE]
+
+    publisher.server.snapshot = lambda: (
+        publisher.sequence + 1,
+        [b"x" * (feed.MAX_MESSAGE + 1), b"snapshot"],
+    )
+    assert receiver.snapshot() == [b"snapshot"]
+
+
+def test_feed_reconnects_after_closed_request(loopback):
+    publisher, receiver, _ = loopback
+
+    with pytest.raises(ConnectionError):
+        receiver.request(b"?")
+    assert receiver.conn is None
+
+    assert receiver.snapshot() == [b"snapshot"]
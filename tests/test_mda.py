@@ -0,0 +1,117 @@
+import logging
+
+import quickfix as fix
+import quickfix42 as fix42
+
+from pytradesim.modules.market.mda import MarketDataAdapter
+from pytradesim.modules.market.utils import Book, BookUpdate
+
+SESSION = fix.SessionID("FIX.4.2", "MDSERVER", "MDCLIENT")
+
+
+def make_adapter(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        fix.Session,
+        "sendToTarget",
+        lambda message, session: sent.append(fix.Message(message)),
+    )
+
+    adapter = MarketDataAdapter()
+    adapter.set_logging(logging.getLogger("test_mda"))
+    adapter.onCreate(SESSION)
+    adapter.clients["MSFT"] = [SESSION]
+    return adapter, sent
+
+
+def entries(message, group):
+    fields = (
+        fix.MDUpdateAction,
+        fix.MDEntryType,
+        fix.MDEntryPx,
+        fix.MDEntrySize,
+        fix.RptSeq,
+    )
+    no_entries = fix.NoMDEntries()
+    message.getField(no_entries)
+
+    result = []
+    for i in range(no_entries.getValue()):
+        message.getGroup(i + 1, group)
+        values = []
+        for field in fields:
+            field = field()
+            if group.isSetField(field):
+                group.getField(field)
+                values.append(field.getValue())
+            else:
+                values.append(None)
+        result.append(tuple(values))
+    return result
+
+
+def test_mda_sends_updates_in_sequence(monkeypatch):
+    adapter, sent = make_adapter(monkeypatch)
+
+    assert not adapter.dispatch(Book("MSFT", [(10, 5)], [(11, 3)], [], 1))
+    assert not adapter.dispatch(
+        BookUpdate(
+            "MSFT",
+            [("change", "b", 10, 2, 1), ("delete", "s", 11, 0, 1)],
+            [(11, 3)],
+            2,
+        )
+    )
+
+    snapshot, update = sent
+    assert snapshot.getHeader().getField(fix.MsgType().getTag()) == "W"
+    assert update.getHeader().getField(fix.MsgType().getTag()) == "X"
+    assert entries(update, fix42.MarketDataIncrementalRefresh().NoMDEntries()) == [
+        ("1", "0", 10, 2, 2),
+        ("2", "1", 11, 0, 2),
+        ("0", "2", 11, 3, 2),
+    ]
+    assert adapter.books["MSFT"] == ({10: 2}, {})
+
+
+def test_mda_requests_snapshot_after_gap(monkeypatch):
+    adapter, sent = make_adapter(monkeypatch)
+
+    # no snapshot yet
+    assert adapter.dispatch(BookUpdate("MSFT", [("new", "b", 10, 5, 1)], [], 4))
+    # updates are dropped until the snapshot arrives
+    assert not adapter.dispatch(BookUpdate("MSFT", [("new", "b", 9, 5, 2)], [], 5))
+    assert sent == []
+
+    assert not adapter.dispatch(Book("MSFT", [(10, 5)], [], [], 6))
+    assert not adapter.dispatch(BookUpdate("MSFT", [("new", "b", 9, 5, 2)], [], 7))
+    # sequence 8 is lost
+    assert adapter.dispatch(BookUpdate("MSFT", [("delete", "b", 9, 0, 2)], [], 9))
+
+    assert len(sent) == 2
+    assert adapter.books["MSFT"] == ({10: 5, 9: 5}, {})
+    assert "MSFT" in adapter.recovering
+
+
+def test_mda_subscribe_returns_snapshot(monkeypatch):
+    adapter, sent = make_adapter(monkeypatch)
+    adapter.dispatch(Book("MSFT", [(10, 5)], [(11, 3)], [(10, 1)], 1))
+
+    request = fix42.MarketDataRequest()
+    request.setField(fix.MDReqID("1"))
+    # snapshot plus updates
+    request.setField(fix.SubscriptionRequestType("1"))
+    request.setField(fix.MarketDepth(0))
+    group = fix42.MarketDataRequest().NoRelatedSym()
+    group.setField(fix.Symbol("MSFT"))
+    request.addGroup(group)
+
+    session = fix.SessionID("FIX.4.2", "MDSERVER", "OTHER")
+    ((target, snapshot),) = adapter.process(request, session)
+
+    assert target == session
+    assert adapter.clients["MSFT"] == [SESSION, session]
+    assert entries(snapshot, fix42.MarketDataSnapshotFullRefresh().NoMDEntries()) == [
+        (None, "0", 10, 5, None),
+        (None, "1", 11, 3, None),
+    ]
@@ -1,4 +1,9 @@
-from pytradesim.modules.orderbook import Order, Orderbook, Trade
+import random
+
+import pytest
+
+from pytradesim.modules.instrument import Instrument
+from pytradesim.modules.orderbook import Order, Orderbook, RecordPool, Trade
 
 
 def test_orderbook_limit_order():
@@ -37,6 +42,21 @@ def test_orderbook_trade():
     assert trade.session == "TESTSESSION"
 
 
+def test_orderbook_fast_constructors():
+    order = Order.make(
+        "HYG", 23.54, 100, "b", "LIMIT", "NEWORDER_1", "TESTSESSION", 1.0
+    )
+    trade = Trade.make("HYG", 100, 23.54, "b", "NEWTRADE_1", "HYG1", "TESTSESSION", 1.0)
+
+    assert order.side == "b"
+    assert order.order_type == "LIMIT"
+    assert order.timestamp == 1.0
+    assert trade.exec_id == "NEWTRADE_1"
+    assert trade.timestamp == 1.0
+    assert not hasattr(order, "__dict__")
+    assert not hasattr(trade, "__dict__")
+
+
 def test_orderbook_symbol():
     orderbook = Orderbook("TEST")
 
@@ -108,6 +128,28 @@ def test_orderbook_replace_price_and_size():
     assert orderbook.bids[23.55][0].price == 23.55
 
 
+def test_orderbook_rejected_replace_keeps_original():
+    orderbook = Orderbook("TEST")
+
+    orderbook.new_order(Order("TEST", 23.54, 100, "B", 2, "NEWORDER_1", "S"))
+    orderbook.new_order(Order("TEST", 23.53, 50, "B", 2, "NEWORDER_2", "S"))
+
+    order = Order("TEST", 23.55, 120, "B", 2, "NEWORDER_2", "S")
+    assert (
+        orderbook.replace_order("NEWORDER_1", order)
+        == "[Internal] duplicate order ID sent"
+    )
+
+    order = Order("OTHER", 23.55, 120, "B", 2, "NEWORDER_3", "S")
+    assert (
+        orderbook.replace_order("NEWORDER_1", order)
+        == "[Internal] incorrect orderbook assignment"
+    )
+
+    assert orderbook.book() == ([(23.54, 100), (23.53, 50)], [])
+    assert sorted(orderbook.live_order_ids) == ["NEWORDER_1", "NEWORDER_2"]
+
+
 def test_orderbook_full_execution():
     orderbook = Orderbook("TEST")
 
@@ -115,10 +157,9 @@ def test_orderbook_full_execution():
     orderbook.new_order(order)
 
     order = Order("TEST", 23.54, 100, "S", 2, "NEWORDER_2", "TESTSESSION")
-    orderbook.new_order(order)
+    trades = orderbook.new_order(order)
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         assert trade.price == 23.54
         assert trade.quantity == 100
@@ -132,12 +173,11 @@ def test_orderbook_market_order_execution():
     orderbook.new_order(order)
 
     order = Order("TEST", 23.59, 50, "S", 1, "NEWORDER_2", "TESTSESSION")
-    orderbook.new_order(order)
+    trades = orderbook.new_order(order)
 
-    assert orderbook.trades.qsize() == 2
+    assert len(trades) == 2
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         assert trade.price == 23.54
         assert trade.quantity == 50
@@ -153,9 +193,9 @@ def test_orderbook_market_order_no_match():
     orderbook.new_order(order)
 
     order = Order("TEST", 23.52, 50, "B", 1, "NEWORDER_2", "TESTSESSION")
-    orderbook.new_order(order)
+    trades = orderbook.new_order(order)
 
-    assert orderbook.trades.qsize() == 0
+    assert len(trades) == 0
     assert orderbook.bids[23.54][0].quantity == 100
     assert orderbook.bbo() == (23.54, float("inf"))
 
@@ -167,10 +207,9 @@ def test_orderbook_partial_passive_execution():
     orderbook.new_order(order)
 
     order = Order("TEST", 23.54, 50, "S", 2, "NEWORDER_2", "TESTSESSION")
-    orderbook.new_order(order)
+    trades = orderbook.new_order(order)
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         assert trade.price == 23.54
         assert trade.quantity == 50
@@ -186,10 +225,9 @@ def test_orderbook_partial_aggressive_execution():
     orderbook.new_order(order)
 
     order = Order("TEST", 23.54, 100, "S", 2, "NEWORDER_2", "TESTSESSION")
-    orderbook.new_order(order)
+    trades = orderbook.new_order(order)
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         assert trade.price == 23.54
         assert trade.quantity == 50
@@ -231,12 +269,11 @@ def test_orderbook_multiple_execution():
     orderbook.new_order(order)
 
     order = Order("TEST", 23.53, 150, "S", 2, "NEWORDER_9", "TESTSESSION")
-    orderbook.new_order(order)
+    trades = orderbook.new_order(order)
 
-    assert orderbook.trades.qsize() == 8
+    assert len(trades) == 8
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         if trade.price == 23.54:
             assert trade.quantity in [50, 30]
@@ -287,12 +324,11 @@ def test_orderbook_replace_execution():
     order = Order(
         "TEST", 23.55, 140, "B", 2, "TESTSESSION_1_NEWORDER_2", "TESTSESSION_1"
     )
-    orderbook.replace_order("TESTSESSION_1_NEWORDER_1", order)
+    trades = orderbook.replace_order("TESTSESSION_1_NEWORDER_1", order)
 
-    assert orderbook.trades.qsize() == 2
+    assert len(trades) == 2
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         assert trade.price == 23.55
         assert trade.quantity == 130
@@ -365,14 +401,13 @@ def test_orderbook_replace_execution_deletion():
     order = Order(
         "TEST", 23.56, 351, "S", 2, "TESTSESSION_2_NEWORDER_3", "TESTSESSION_2"
     )
-    orderbook.replace_order("TESTSESSION_2_NEWORDER_2", order)
+    trades = orderbook.replace_order("TESTSESSION_2_NEWORDER_2", order)
 
-    assert orderbook.trades.qsize() == 2
+    assert len(trades) == 2
 
     assert orderbook.bbo() == (23.54, 23.56)
 
-    while not orderbook.trades.empty():
-        trade = orderbook.trades.get()
+    for trade in trades:
 
         assert trade.price == 23.56
         assert trade.quantity == 350
@@ -395,3 +430,462 @@ def test_orderbook_duplicate_order_id():
     )
 
     assert orderbook.new_order(order) == "[Internal] duplicate order ID sent"
+
+
+def test_orderbook_bbo_after_level_removal():
+    orderbook = Orderbook("TEST")
+
+    for i, price in enumerate([23.50, 23.52, 23.54]):
+        order = Order("TEST", price, 100, "B", 2, f"BID_{i}", "TESTSESSION")
+        orderbook.new_order(order)
+
+    for i, price in enumerate([23.60, 23.58, 23.56]):
+        order = Order("TEST", price, 100, "S", 2, f"ASK_{i}", "TESTSESSION")
+        orderbook.new_order(order)
+
+    assert orderbook.bbo() == (23.54, 23.56)
+
+    orderbook.delete_order("BID_2")
+    orderbook.delete_order("ASK_2")
+
+    assert orderbook.bbo() == (23.52, 23.58)
+
+    order = Order("TEST", 23.52, 150, "S", 2, "ASK_3", "TESTSESSION")
+    orderbook.new_order(order)
+
+    assert orderbook.bbo() == (23.50, 23.52)
+    assert orderbook.bids.prices == [23.50]
+    assert orderbook.asks.prices == [23.52, 23.58, 23.60]
+
+
+def test_orderbook_deletion_keeps_fifo_priority():
+    orderbook = Orderbook("TEST")
+
+    for i in range(5):
+        order = Order("TEST", 23.54, 10 + i, "B", 2, f"NEWORDER_{i}", "TESTSESSION")
+        orderbook.new_order(order)
+
+    orderbook.delete_order("NEWORDER_2")
+    orderbook.delete_order("NEWORDER_0")
+    orderbook.delete_order("NEWORDER_4")
+
+    assert [o.order_id for o in orderbook.bids[23.54]] == ["NEWORDER_1", "NEWORDER_3"]
+    assert (
+        orderbook.delete_order("NEWORDER_2") == "[Internal] orignal order ID not found"
+    )
+
+    order = Order("TEST", 23.54, 11, "S", 2, "NEWORDER_5", "TESTSESSION")
+    orderbook.new_order(order)
+
+    assert orderbook.bids[23.54][0].order_id == "NEWORDER_3"
+    assert orderbook.bids[23.54][0].quantity == 13
+
+
+def test_orderbook_book_depth():
+    orderbook = Orderbook("TEST")
+
+    orders = [
+        (23.54, 100, "B"),
+        (23.54, 50, "B"),
+        (23.53, 20, "B"),
+        (23.51, 10, "B"),
+        (23.56, 30, "S"),
+        (23.58, 80, "S"),
+        (23.58, 20, "S"),
+    ]
+    for i, (price, quantity, side) in enumerate(orders):
+        order = Order("TEST", price, quantity, side, 2, f"NEWORDER_{i}", "TESTSESSION")
+        orderbook.new_order(order)
+
+    assert orderbook.book() == (
+        [(23.54, 150), (23.53, 20), (23.51, 10)],
+        [(23.56, 30), (23.58, 100)],
+    )
+    assert orderbook.book(depth=1) == ([(23.54, 150)], [(23.56, 30)])
+
+    order = Order("TEST", 23.54, 120, "S", 2, "NEWORDER_7", "TESTSESSION")
+    orderbook.new_order(order)
+    orderbook.delete_order("NEWORDER_5")
+
+    assert orderbook.book(depth=2) == (
+        [(23.54, 30), (23.53, 20)],
+        [(23.56, 30), (23.58, 20)],
+    )
+    assert len(orderbook.bids[23.54]) == 1
+
+
+def test_orderbook_tick_ladder_level_identity():
+    instrument = Instrument("TEST", 1, "ISIN000001", 23.50, 0.01)
+    orderbook = Orderbook("TEST", instrument)
+
+    order = Order("TEST", 23.54, 100, "B", 2, "NEWORDER_1", "TESTSESSION")
+    orderbook.new_order(order)
+
+    order = Order("TEST", 23.540000001, 50, "B", 2, "NEWORDER_2", "TESTSESSION")
+    orderbook.new_order(order)
+
+    assert len(orderbook.bids[23.54]) == 2
+    assert orderbook.bids[23.54][1].price == 23.54
+    assert orderbook.book() == ([(23.54, 150)], [])
+
+
+def test_orderbook_tick_ladder_rejects_off_tick_prices():
+    instrument = Instrument("TEST", 1, "ISIN000001", 100.0, 0.01)
+    orderbook = Orderbook("TEST", instrument)
+
+    orderbook.new_order(Order("TEST", 100.01, 50, "S", 2, "ASK_1", "TESTSESSION"))
+
+    order = Order("TEST", 100.006, 50, "B", 2, "BID_1", "TESTSESSION")
+    assert orderbook.new_order(order) == "[Internal] price not on the tick grid"
+
+    # float noise around a tick is still accepted
+    limit = 100.0100000001
+    order = Order("TEST", limit, 20, "B", 2, "BID_2", "TESTSESSION")
+    trades = orderbook.new_order(order)
+    assert [(trade.price, trade.quantity) for trade in trades] == [
+        (100.01, 20),
+        (100.01, 20),
+    ]
+
+    for trade in trades:
+        if trade.side == "b":
+            assert trade.price <= limit
+    assert orderbook.book() == ([], [(100.01, 30)])
+
+
+def test_orderbook_tick_ladder_growth_and_bbo():
+    instrument = Instrument("TEST", 1, "ISIN000001", 23.50, 0.01)
+    orderbook = Orderbook("TEST", instrument)
+
+    for i, price in enumerate([0.01, 23.49, 5000.0]):
+        order = Order("TEST", price, 10, "S", 2, f"ASK_{i}", "TESTSESSION")
+        orderbook.new_order(order)
+
+    order = Order("TEST", 0.5, 10, "B", 2, "BID_0", "TESTSESSION")
+    orderbook.new_order(order)
+
+    assert orderbook.bbo() == (float("-inf"), 23.49)
+    assert orderbook.book() == ([], [(23.49, 10), (5000.0, 10)])
+
+    orderbook.delete_order("ASK_1")
+
+    assert orderbook.bbo() == (float("-inf"), 5000.0)
+
+
+def test_orderbook_tick_ladder_price_band():
+    instrument = Instrument("TEST", 1, "ISIN000001", 23.50, 0.01)
+    orderbook = Orderbook("TEST", instrument, price_band=1000)
+
+    for i, price in enumerate([5e6, -5e6, 33.51, float("inf"), float("nan")]):
+        order = Order("TEST", price, 10, "S", 2, f"ASK_{i}", "TESTSESSION")
+        assert orderbook.new_order(order) == "[Internal] price outside the price band"
+
+    order = Order("TEST", 33.50, 10, "S", 2, "ASK_5", "TESTSESSION")
+    assert orderbook.new_order(order) == []
+    assert orderbook.book() == ([], [(33.5, 10)])
+    assert list(orderbook.live_order_ids) == ["ASK_5"]
+
+    with pytest.raises(ValueError):
+        Orderbook("TEST", Instrument("TEST", 1, "ISIN000001", 23.50, 0))
+
+
+def test_orderbook_tick_ladder_matches_price_levels():
+    random.seed(7)
+    instrument = Instrument("TEST", 1, "ISIN000001", 50.0, 0.01)
+    orderbooks = [Orderbook("TEST"), Orderbook("TEST", instrument)]
+    trades = [[], []]
+    live = []
+
+    for i in range(2000):
+        if live and random.random() < 0.3:
+            order_id = live.pop(random.randrange(len(live)))
+            for orderbook in orderbooks:
+                orderbook.delete_order(order_id)
+            continue
+
+        price = round(random.uniform(49, 51), 2)
+        quantity = random.randint(1, 100)
+        side = random.choice(["B", "S"])
+        order_type = 1 if random.random() < 0.05 else 2
+        order_id = f"NEWORDER_{i}"
+        live.append(order_id)
+
+        for orderbook, fills in zip(orderbooks, trades):
+            order = Order("TEST", price, quantity, side, order_type, order_id, "S")
+            for trade in orderbook.new_order(order):
+                fills.append((trade.order_id, trade.price, trade.quantity))
+
+        assert orderbooks[0].bbo() == orderbooks[1].bbo()
+
+    assert trades[0] == trades[1]
+    assert orderbooks[0].book() == orderbooks[1].book()
+
+
+def test_orderbook_sweep_stops_at_limit():
+    orderbook = Orderbook("TEST")
+
+    for i, price in enumerate([23.55, 23.56, 23.57, 23.58]):
+        for j in range(3):
+            order = Order("TEST", price, 10, "S", 2, f"ASK_{i}_{j}", "TESTSESSION")
+            orderbook.new_order(order)
+
+    order = Order("TEST", 23.56, 75, "B", 2, "NEWORDER_1", "TESTSESSION")
+    trades = orderbook.new_order(order)
+
+    assert len(trades) == 12
+    assert orderbook.book() == ([(23.56, 15)], [(23.57, 30), (23.58, 30)])
+    assert orderbook.asks[23.57][0].order_id == "ASK_2_0"
+
+
+def test_orderbook_record_pool():
+    pool = RecordPool(size=2)
+    orderbook = Orderbook("TEST", pool=pool)
+
+    order = pool.order("TEST", 23.54, 100, "b", "LIMIT", "NEWORDER_1", "S", 0.0)
+    orderbook.new_order(order)
+    orderbook.delete_order("NEWORDER_1")
+
+    assert pool.stats() == {"hits": 0, "misses": 1, "free_orders": 1, "free_trades": 0}
+
+    recycled = pool.order("TEST", 23.55, 50, "s", "LIMIT", "NEWORDER_2", "S", 0.0)
+    orderbook.new_order(recycled)
+
+    assert recycled is order
+    assert orderbook.asks[23.55][0].order_id == "NEWORDER_2"
+
+    order = pool.order("TEST", 23.55, 50, "b", "LIMIT", "NEWORDER_3", "S", 0.0)
+    trades = orderbook.new_order(order)
+
+    for trade in trades:
+        pool.release(trade)
+
+    trade = pool.trade("TEST", 10, 23.55, "b", "EXEC_1", "NEWORDER_4", "S", 0.0)
+
+    assert trade.exec_id == "EXEC_1"
+    assert pool.stats() == {"hits": 2, "misses": 4, "free_orders": 2, "free_trades": 1}
+
+
+def test_orderbook_trade_queue_adapter():
+    orderbook = Orderbook("TEST", trade_queue=True)
+
+    order = Order("TEST", 23.54, 100, "B", 2, "NEWORDER_1", "TESTSESSION")
+    orderbook.new_order(order)
+
+    order = Order("TEST", 23.54, 40, "S", 2, "NEWORDER_2", "TESTSESSION")
+    trades = orderbook.new_order(order)
+
+    assert orderbook.trades.qsize() == 2
+    assert [orderbook.trades.get(), orderbook.trades.get()] == trades
+    assert Orderbook("TEST").trades is None
+
+
+def test_orderbook_submit_many_matches_new_order():
+    random.seed(11)
+    specs = []
+    for i in range(3000):
+        price = round(random.uniform(49, 51), 2)
+        quantity = random.randint(1, 100)
+        side = random.choice(["B", "S"])
+        order_type = 1 if random.random() < 0.05 else 2
+        specs.append(("TEST", price, quantity, side, order_type, f"NEWORDER_{i}", "S"))
+    specs.append(specs[10])
+    specs.append(("OTHER", 50.0, 1, "B", 2, "NEWORDER_X", "S"))
+
+    orderbook = Orderbook("TEST")
+    single_fills = []
+    single_rejects = []
+    for spec in specs:
+        result = orderbook.new_order(Order(*spec))
+        if isinstance(result, str):
+            single_rejects.append((spec[5], result))
+        else:
+            single_fills.extend(result)
+
+    batch = Orderbook("TEST")
+    fills, rejects = batch.submit_many([Order(*spec) for spec in specs])
+
+    def key(trade):
+        return (trade.order_id, trade.price, trade.quantity, trade.exec_id)
+
+    assert [key(t) for t in fills] == [key(t) for t in single_fills]
+    assert rejects == single_rejects
+    assert batch.book() == orderbook.book()
+
+    cancels = random.sample(list(batch.live_order_ids), 500) + ["UNKNOWN"]
+    for order_id in cancels:
+        orderbook.delete_order(order_id)
+
+    assert batch.cancel_many(cancels) == [
+        ("UNKNOWN", "[Internal] orignal order ID not found")
+    ]
+    assert batch.book() == orderbook.book()
+
+
+def test_orderbook_auction_uncross():
+    pytest.importorskip("numpy")
+    orderbook = Orderbook("TEST")
+    orderbook.start_auction()
+
+    orders = [
+        (23.56, 100, "B"),
+        (23.55, 50, "B"),
+        (23.55, 30, "B"),
+        (23.53, 40, "B"),
+        (23.52, 60, "S"),
+        (23.54, 70, "S"),
+        (23.55, 80, "S"),
+        (23.57, 90, "S"),
+    ]
+    for i, (price, quantity, side) in enumerate(orders):
+        order = Order("TEST", price, quantity, side, 2, f"NEWORDER_{i}", "TESTSESSION")
+        assert orderbook.new_order(order) == []
+
+    order = Order("TEST", 23.55, 10, "B", 1, "NEWORDER_M", "TESTSESSION")
+    assert orderbook.new_order(order) == (
+        "[Internal] market orders not accepted during auction"
+    )
+
+    assert orderbook.bbo() == (23.56, 23.52)
+    assert orderbook.equilibrium() == (23.55, 180)
+
+    trades = orderbook.uncross()
+    assert all(type(trade.quantity) is int for trade in trades)
+
+    bought = {}
+    for trade in trades:
+        assert trade.price == 23.55
+        if trade.side == "b":
+            bought[trade.order_id] = bought.get(trade.order_id, 0) + trade.quantity
+
+    assert bought == {"NEWORDER_0": 100, "NEWORDER_1": 50, "NEWORDER_2": 30}
+    assert sum(t.quantity for t in trades if t.side == "s") == 180
+    assert orderbook.book() == ([(23.53, 40)], [(23.55, 30), (23.57, 90)])
+    assert orderbook.asks[23.55][0].order_id == "NEWORDER_6"
+
+    order = Order("TEST", 23.55, 30, "B", 2, "NEWORDER_8", "TESTSESSION")
+    assert len(orderbook.new_order(order)) == 2
+
+
+def test_orderbook_auction_no_cross():
+    pytest.importorskip("numpy")
+    orderbook = Orderbook("TEST")
+    orderbook.start_auction()
+
+    orderbook.new_order(Order("TEST", 23.50, 10, "B", 2, "NEWORDER_1", "S"))
+    orderbook.new_order(Order("TEST", 23.60, 10, "S", 2, "NEWORDER_2", "S"))
+
+    assert orderbook.uncross() == []
+    assert orderbook.in_auction is False
+    assert orderbook.book() == ([(23.50, 10)], [(23.60, 10)])
+
+
+def test_orderbook_retires_filled_order_ids():
+    orderbook = Orderbook("TEST")
+
+    orderbook.new_order(Order("TEST", 23.54, 100, "B", 2, "NEWORDER_1", "S"))
+    orderbook.new_order(Order("TEST", 23.54, 60, "S", 2, "NEWORDER_2", "S"))
+    orderbook.new_order(Order("TEST", 23.50, 40, "S", 1, "NEWORDER_3", "S"))
+    orderbook.new_order(Order("TEST", 23.60, 10, "B", 1, "NEWORDER_4", "S"))
+
+    assert orderbook.live_order_ids == {}
+    assert orderbook.stats() == {
+        "live_orders": 0,
+        "recent_ids": 0,
+        "bid_levels": 0,
+        "ask_levels": 0,
+    }
+    assert orderbook.new_order(Order("TEST", 23.54, 1, "B", 2, "NEWORDER_1", "S")) == []
+
+
+def test_orderbook_duplicate_window():
+    orderbook = Orderbook("TEST", duplicate_window=2)
+
+    for i in range(3):
+        orderbook.new_order(Order("TEST", 23.54, 10, "B", 2, f"NEWORDER_{i}", "S"))
+        orderbook.delete_order(f"NEWORDER_{i}")
+
+    assert orderbook.stats()["recent_ids"] == 2
+
+    order = Order("TEST", 23.54, 10, "B", 2, "NEWORDER_2", "S")
+    assert orderbook.new_order(order) == "[Internal] duplicate order ID sent"
+
+    order = Order("TEST", 23.54, 10, "B", 2, "NEWORDER_0", "S")
+    assert orderbook.new_order(order) == []
+
+
+def apply_level_changes(mirror, changes):
+    for action, side, price, size, level in changes:
+        levels = mirror[side]
+        if action == "delete":
+            assert price in levels
+            del levels[price]
+        else:
+            assert (price in levels) == (action == "change")
+            levels[price] = size
+
+
+@pytest.mark.parametrize("ladder", [False, True])
+def test_orderbook_level_changes_rebuild_book(ladder):
+    random.seed(11)
+    instrument = Instrument("TEST", 1, "ISIN000001", 50.0, 0.01) if ladder else None
+    orderbook = Orderbook("TEST", instrument, deltas=True)
+    mirror = {"b": {}, "s": {}}
+    live = []
+
+    for i in range(2000):
+        if live and random.random() < 0.3:
+            orderbook.delete_order(live.pop(random.randrange(len(live))))
+        else:
+            price = round(random.uniform(49, 51), 2)
+            side = random.choice(["B", "S"])
+            order_type = 1 if random.random() < 0.05 else 2
+            order = Order(
+                "TEST", price, random.randint(1, 100), side, order_type, f"O_{i}", "S"
+            )
+            live.append(order.order_id)
+            orderbook.new_order(order)
+
+        if i % 7 == 0:
+            changes = orderbook.level_changes()
+            apply_level_changes(mirror, changes)
+
+            bids, asks = orderbook.book()
+            positions = {("b", price): n for n, (price, _) in enumerate(bids, 1)}
+            positions.update({("s", price): n for n, (price, _) in enumerate(asks, 1)})
+            for action, side, price, size, level in changes:
+                if action != "delete":
+                    assert positions[(side, price)] == level
+
+            assert sorted(mirror["b"].items(), reverse=True) == bids
+            assert sorted(mirror["s"].items()) == asks
+
+    apply_level_changes(mirror, orderbook.level_changes())
+    assert orderbook.level_changes() == []
+    assert orderbook.book() == (
+        sorted(mirror["b"].items(), reverse=True),
+        sorted(mirror["s"].items()),
+    )
+
+
+def test_orderbook_level_changes():
+    orderbook = Orderbook("TEST", deltas=True)
+
+    for i, (price, quantity, side) in enumerate(
+        [(23.54, 100, "B"), (23.53, 50, "B"), (23.56, 70, "S")]
+    ):
+        orderbook.new_order(Order("TEST", price, quantity, side, 2, f"O_{i}", "S"))
+
+    assert orderbook.level_changes() == [
+        ("new", "b", 23.54, 100, 1),
+        ("new", "b", 23.53, 50, 2),
+        ("new", "s", 23.56, 70, 1),
+    ]
+
+    orderbook.new_order(Order("TEST", 23.54, 60, "S", 2, "O_3", "S"))
+    orderbook.new_order(Order("TEST", 23.54, 40, "S", 2, "O_4", "S"))
+    orderbook.new_order(Order("TEST", 23.55, 10, "S", 2, "O_5", "S"))
+
+    assert orderbook.level_changes() == [
+        ("delete", "b", 23.54, 0, 1),
+        ("new", "s", 23.55, 10, 1),
+    ]
@@ -0,0 +1,79 @@
+import logging
+import threading
+
+from pytradesim.modules.outbound import OutboundSender
+
+
+class Session:
+    def __init__(self, name):
+        self.name = name
+
+    def toString(self):
+        return self.name
+
+
+def test_outbound_keeps_session_order():
+    sent = []
+    sessions = [Session("CLIENT1"), Session("CLIENT2")]
+    sender = OutboundSender(
+        lambda message, session: sent.append((session.toString(), message)),
+        logging.getLogger(__name__),
+        maxsize=8,
+        batch=4,
+    )
+    sender.start()
+
+    for i in range(100):
+        sender.put([(session, i) for session in sessions])
+
+    sender.stop()
+
+    for session in sessions:
+        messages = [message for name, message in sent if name == session.name]
+        assert messages == list(range(100))
+    assert sender.stats()["sent"] == 200
+    assert sender.stats()["depth"] == 0
+    assert sender.stats()["max_depth"] <= 8
+
+
+def test_outbound_bounded_queue_blocks_producer():
+    release = threading.Event()
+    sender = OutboundSender(
+        lambda message, session: release.wait(),
+        logging.getLogger(__name__),
+        maxsize=2,
+        batch=1,
+    )
+    sender.start()
+    session = Session("CLIENT1")
+
+    producer = threading.Thread(
+        target=lambda: [sender.put([(session, i)]) for i in range(10)]
+    )
+    producer.start()
+    producer.join(0.2)
+
+    assert producer.is_alive()
+    assert sender.depth() == 2
+
+    release.set()
+    producer.join()
+    sender.stop()
+
+    assert sender.stats()["sent"] == 10
+
+
+def test_outbound_survives_send_errors():
+    sent = []
+
+    def send(message, session):
+        if message == 1:
+            raise RuntimeError("session not found")
+        sent.append(message)
+
+    sender = OutboundSender(send, logging.getLogger(__name__))
+    sender.start()
+    sender.put([(Session("CLIENT1"), i) for i in range(3)])
+    sender.stop()
+
+    assert sent == [0, 2]
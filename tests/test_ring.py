@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+
+import pytest
+
+pytest.importorskip("multiprocessing.shared_memory")
+
+from pytradesim.modules.market import codec  # noqa: E402
+from pytradesim.modules.market.ring import RingBuffer, RingReader  # noqa: E402
+from pytradesim.modules.market.utils import Book, BookUpdate  # noqa: E402
+
+
+@pytest.fixture
+def ring():
+    ring = RingBuffer.create(f"pytradesim_test_{os.getpid()}", slots=4, slot_size=64)
+    yield ring
+    ring.close()
+
+
+def test_ring_readers_see_every_message(ring):
+    consumer = RingBuffer.attach(ring.memory.name)
+    readers = [RingReader(consumer), RingReader(consumer)]
+
+    assert readers[0].read(bytes) is None
+    for payload in (b"a", b"bb", b"ccc"):
+        ring.publish(payload)
+
+    for reader in readers:
+        assert [reader.read(bytes) for _ in range(4)] == [b"a", b"bb", b"ccc", None]
+    consumer.close()
+
+
+def test_ring_replaces_stale_segment(ring):
+    ring.publish(b"a")
+    stale = RingBuffer.attach(ring.memory.name)
+
+    replaced = RingBuffer.create(ring.memory.name, slots=2, slot_size=32)
+    assert replaced.cursor() == 0
+    assert stale.cursor() == 1
+
+    stale.close()
+    replaced.close()
+    ring.owner = False
+
+
+def test_ring_reader_skips_lost_messages(ring):
+    reader = RingReader(ring)
+
+    for i in range(1, 7):
+        assert ring.publish(bytes([i])) == i
+
+    assert reader.read(bytes) == bytes([3])
+    assert reader.lost == 2
+
+
+def test_ring_rejects_oversized_message(ring):
+    with pytest.raises(ValueError):
+        ring.publish(bytes(ring.slot_size))
+
+
+def read_books(name, count, results):
+    ring = RingBuffer.attach(name)
+    reader = RingReader(ring, start=1)
+    books = []
+    while len(books) < count:
+        book = reader.read(lambda data: codec.decode(data, Book, BookUpdate))
+        if book is not None:
+            books.append(book.sequence)
+    results.put(books)
+    ring.close()
+
+
+def test_ring_is_shared_across_processes(ring):
+    results = multiprocessing.Queue()
+    for sequence in range(1, 4):
+        ring.publish(codec.encode(BookUpdate("HYG", [], [], sequence)))
+
+    process = multiprocessing.Process(
+        target=read_books, args=(ring.memory.name, 3, results)
+    )
+    process.start()
+    assert results.get(timeout=10) == [1, 2, 3]
+    process.join()
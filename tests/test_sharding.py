@@ -0,0 +1,48 @@
+import logging
+import threading
+
+from pytradesim.modules.sharding import MatchingShards
+
+
+def test_sharding_routes_symbol_to_one_worker():
+    seen = {}
+    lock = threading.Lock()
+
+    def handler(symbol, sequence):
+        with lock:
+            seen.setdefault(symbol, []).append(
+                (sequence, threading.current_thread().name)
+            )
+
+    shards = MatchingShards(4, handler, logging.getLogger(__name__))
+    shards.start()
+
+    for sequence in range(100):
+        for symbol in ["HYG", "MSFT", "AAPL", "TEST"]:
+            shards.submit(symbol, symbol, sequence)
+
+    shards.stop()
+
+    for symbol, tasks in seen.items():
+        assert [sequence for sequence, _ in tasks] == list(range(100))
+        assert {name for _, name in tasks} == {f"shard-{shards.shard(symbol)}"}
+
+
+def test_sharding_survives_handler_errors():
+    done = []
+
+    def handler(value):
+        if value == 1:
+            raise ValueError("bad message")
+        done.append(value)
+
+    shards = MatchingShards(1, handler, logging.getLogger(__name__))
+    shards.start()
+
+    for value in range(3):
+        shards.submit("TEST", value)
+
+    shards.stop()
+
+    assert done == [0, 2]
+    assert shards.depths() == [0]
@@ -0,0 +1,72 @@
+import logging
+import time
+from datetime import datetime
+
+import pytest
+
+fix = pytest.importorskip("quickfix")
+
+from pytradesim.modules.utils import (  # noqa: E402
+    LogFormat,
+    format_value,
+    setup_logging,
+)
+
+
+@pytest.mark.parametrize(
+    "value, text",
+    [
+        (23.54, "23.54"),
+        (40.0, "40"),
+        (0.00001, "0.00001"),
+        (1.5e-10, "0.00000000015"),
+        (0.1 + 0.2, "0.3"),
+        (-2e-05, "-0.00002"),
+        (1e-17, "0"),
+        ("HYG", "HYG"),
+    ],
+)
+def test_format_value_matches_quickfix(value, text):
+    assert format_value(value) == text
+    if isinstance(value, float) and value >= 1e-15:
+        assert fix.AvgPx(value).getString() == text
+
+
+def test_log_format_caches_second():
+    formatter = LogFormat()
+    created = time.time()
+
+    for offset in (0, 0.25, 0.5, 1.5, 61):
+        record = logging.makeLogRecord({"created": created + offset})
+        stamp = datetime.fromtimestamp(int(created + offset))
+        fraction = "{0:.6f}".format(created + offset).split(".")[1]
+
+        assert formatter.formatTime(record) == (
+            f"{stamp.strftime('%Y-%m-%d %H:%M:%S')}.{fraction}"
+        )
+
+
+def test_setup_logging_queued(tmp_path):
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    level = root.level
+
+    try:
+        logger = setup_logging(tmp_path, "server", queued=True)
+        logger.setLevel(logging.INFO)
+        queue_handler = next(
+            handler for handler in root.handlers if handler not in handlers
+        )
+
+        for i in range(1000):
+            logger.info(f"Incoming new order {i}.")
+        queue_handler.listener.stop()
+        for handler in queue_handler.listener.handlers:
+            handler.close()
+    finally:
+        root.handlers = handlers
+        root.setLevel(level)
+
+    lines = (tmp_path / "server.log").read_text().splitlines()
+    assert len(lines) == 1000
+    assert lines[-1].endswith("Incoming new order 999.")